@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Compare installed JSON encoders of RESTServer on lists of rows
+with int, str, float, date, datetime and Decimal values.
+
+usage: python benchmarks/bench_json.py [number of rows ...]
+"""
+
+import datetime
+import os
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from woof.server.server import JSON_ENCODERS, get_json_encoder
+
+
+def build_rows(nb_rows):
+    start = datetime.datetime(2020, 1, 1)
+    return [{'id': i,
+             'name': 'measure {}'.format(i),
+             'value': i / 3,
+             'day': (start + datetime.timedelta(days=i % 365)).date(),
+             'created': start + datetime.timedelta(seconds=i),
+             'price': Decimal(i) / 100}
+            for i in range(nb_rows)]
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000]
+    print('{:>7} {:>9} {:>12} {:>12}'.format('rows', 'encoder', 'time (ms)', 'MB/second'))
+    for nb_rows in sizes:
+        rows = build_rows(nb_rows)
+        for name in JSON_ENCODERS:
+            try:
+                encoder = get_json_encoder(name)
+            except ImportError:
+                print('{:>7} {:>9} {:>12}'.format(nb_rows, name, 'not installed'))
+                continue
+
+            size = len(encoder.dumps(rows))
+            elapsed = min(timeit.repeat(lambda: encoder.dumps(rows), number=10, repeat=3)) / 10
+            print('{:>7} {:>9} {:>12.2f} {:>12.1f}'.format(
+                nb_rows, name, elapsed * 1000, size / elapsed / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Compare memory used per resource loaded by a query on sqlite
+without and with Meta.compact.
+
+usage: python benchmarks/bench_memory.py [number of rows]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from woof.db import DataBase
+from woof.resource import MetaResource, Resource, StringField, IntegerField, FloatField
+
+
+def create_measure(is_compact, nb_rows):
+    MetaResource.clear()
+
+    class Measure(Resource):
+        name = StringField()
+        count = IntegerField()
+        value = FloatField()
+        unit = StringField()
+
+        class Meta:
+            compact = is_compact
+    MetaResource.initialize(DataBase('sqlite', database=':memory:'))
+    MetaResource.create_tables()
+    Measure.bulk_create(dict(name='measure {}'.format(i), count=i, value=i / 3, unit='m')
+                        for i in range(nb_rows))
+    return Measure
+
+
+def run(resource):
+    """
+    Return bytes per resource and seconds to load them.
+    """
+    query = resource.select().batch(1000)
+    tracemalloc.start()
+    start = time.perf_counter()
+    measures = list(query)
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / len(measures), elapsed
+
+
+def main():
+    nb_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print('{:>8} {:>8} {:>12} {:>10}'.format('compact', 'rows', 'bytes/row', 'time (s)'))
+    for compact in (False, True):
+        resource = create_measure(compact, nb_rows)
+        print('{:>8} {:>8} {:>12.0f} {:>10.3f}'.format(
+            str(compact), nb_rows, *run(resource)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Compare requests per second of crud controllers served by RESTServer
+without and with optimize on sqlite.
+
+usage: python benchmarks/bench_optimizer.py [number of requests]
+"""
+
+import json
+import os
+import sys
+import time
+from io import BytesIO
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from woof.db import DataBase
+from woof.resource import MetaResource, Resource, StringField, IntegerField
+from woof.server import RESTServer
+from woof.url import EntryPoint
+
+
+def create_entry_point():
+    MetaResource.clear()
+
+    class Measure(Resource):
+        name = StringField()
+        count = IntegerField()
+
+    root = EntryPoint('/api')
+    root.crud('/measures/[id]', Measure)
+    MetaResource.initialize(DataBase('sqlite', database=':memory:'))
+    MetaResource.create_tables()
+    return root
+
+
+def request(server, method, path, body=None):
+    body = b'' if body is None else json.dumps(body).encode('utf-8')
+    environ = {'REQUEST_METHOD': method, 'PATH_INFO': path, 'QUERY_STRING': '',
+               'CONTENT_LENGTH': str(len(body)), 'wsgi.input': BytesIO(body)}
+    return b''.join(server(environ, lambda status, headers: None))
+
+
+def run(server, number):
+    """
+    Return requests per second of each method.
+    """
+    results = []
+    scenarios = (
+        ('POST', lambda i: ('/api/measures', {'name': 'measure {}'.format(i), 'count': i})),
+        ('GET', lambda i: ('/api/measures/{}'.format(i + 1), None)),
+        ('PUT', lambda i: ('/api/measures/{}'.format(i + 1), {'name': 'measure', 'count': -i})),
+        ('GET list', lambda i: ('/api/measures', None)),
+        ('DELETE', lambda i: ('/api/measures/{}'.format(i + 1), None)),
+    )
+    for name, make_request in scenarios:
+        method = name.split()[0]
+        count = number if name != 'GET list' else max(1, number // 100)
+        start = time.perf_counter()
+        for i in range(count):
+            path, body = make_request(i)
+            request(server, method, path, body)
+        results.append(count / (time.perf_counter() - start))
+    return results
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    print('{:>9} {:>9} {:>9} {:>9} {:>9} {:>9}'.format(
+        'optimize', 'POST/s', 'GET/s', 'PUT/s', 'GET list/s', 'DELETE/s'))
+    for optimize in (False, True):
+        server = RESTServer(create_entry_point(), optimize=optimize)
+        print('{:>9} {:>9.0f} {:>9.0f} {:>9.0f} {:>10.0f} {:>9.0f}'.format(
+            str(optimize), *run(server, number)))
+
+
+if __name__ == '__main__':
+    main()
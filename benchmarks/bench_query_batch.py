@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Measure rows per second read by Query iteration on sqlite
+according to the batch size.
+
+usage: python benchmarks/bench_query_batch.py [number of rows ...]
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from woof.db import DataBase
+from woof.resource import MetaResource, Resource, StringField, IntegerField, FloatField
+
+
+def create_database(nb_rows):
+    MetaResource.clear()
+
+    class Measure(Resource):
+        name = StringField()
+        count = IntegerField()
+        value = FloatField()
+
+    MetaResource.initialize(DataBase('sqlite', database=':memory:'))
+    MetaResource.create_tables()
+    connection = MetaResource.db.execute('SELECT 1').connection
+    connection.executemany(
+        'INSERT INTO measure (name, count, value) VALUES (?, ?, ?)',
+        (('measure {}'.format(i), i, i / 3) for i in range(nb_rows)))
+    connection.commit()
+    return Measure
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100000, 1000000]
+    print('{:>9} {:>7} {:>13}'.format('rows', 'batch', 'rows/second'))
+    for nb_rows in sizes:
+        resource = create_database(nb_rows)
+        for batch_size in (1, 10, 100, 1000):
+            start = time.perf_counter()
+            count = 0
+            for _ in resource.select().batch(batch_size):
+                count += 1
+            elapsed = time.perf_counter() - start
+            print('{:>9} {:>7} {:>13.0f}'.format(count, batch_size, count / elapsed))
+
+
+if __name__ == '__main__':
+    main()
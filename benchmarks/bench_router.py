@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Compare URLPathTree.get (walk, compiled and cached) with RegexRouter.get.
+
+Walk and compiled trees are built without cache, the cached tree is
+the compiled tree with the default LRU cache.
+
+usage: python benchmarks/bench_router.py [number of lookups]
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from woof.url import EntryPoint, URLPathTree, RegexRouter
+
+
+def ctrl(**kwargs):
+    ...
+
+
+def build_entry_point(nb_routes):
+    """
+    Create an entry point with nb_routes templates for get method.
+    """
+    root = EntryPoint('/api')
+    templates = ('/resource{}', '/resource{}/{{id}}',
+                 '/resource{}/{{id}}/items', '/resource{}/{{id}}/items/{{item_id}}')
+    for route in range(nb_routes):
+        root.get(templates[route % 4].format(route // 4))(ctrl)
+    return root
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print('{:>7} {:>15} {:>15} {:>15} {:>15}'.format(
+        'routes', 'tree walk (us)', 'compiled (us)', 'cached (us)', 'regex (us)'))
+
+    for nb_routes in (10, 100, 1000):
+        root = build_entry_point(nb_routes)
+        last = nb_routes // 4 - 1
+        paths = ['/api/resource{}'.format(last),
+                 '/api/resource{}/42'.format(last),
+                 '/api/resource{}/42/items/3'.format(last)]
+
+        walked = URLPathTree(cache_size=0)
+        compiled = URLPathTree(cache_size=0)
+        cached = URLPathTree()
+        for template, controller in root.get_urls.get_templates():
+            for tree in (walked, compiled, cached):
+                tree.add(template, controller)
+        compiled.compile()
+        cached.compile()
+        router = RegexRouter(root)
+
+        def run_walk():
+            for path in paths:
+                walked.get(path)
+
+        def run_compiled():
+            for path in paths:
+                compiled.get(path)
+
+        def run_cached():
+            for path in paths:
+                cached.get(path)
+
+        def run_regex():
+            for path in paths:
+                router.get('GET', path)
+
+        results = []
+        for function in (run_walk, run_compiled, run_cached, run_regex):
+            elapsed = min(timeit.repeat(function, number=number // 10, repeat=3))
+            results.append(elapsed / (number // 10) / len(paths) * 1e6)
+
+        print('{:>7} {:>15.2f} {:>15.2f} {:>15.2f} {:>15.2f}'.format(nb_routes, *results))
+
+
+if __name__ == '__main__':
+    main()
@@ -48,7 +48,7 @@ class WSGIMockServer:
         return self.responce
 
     def __getattr__(self, name):
-        if name in ('get', 'delete', 'post', 'put',
+        if name in ('get', 'delete', 'post', 'put', 'patch',
                     'options', 'head', 'trace', 'connect'):
             self.environ = {}
             setup_testing_defaults(self.environ)
@@ -60,6 +60,8 @@ class WSGIMockServer:
 
 class TestCrud(unittest.TestCase):
 
+    optimize = False
+
     def AssertJsonEqual(self, serialized, expected):
         self.assertEqual(json.loads(serialized.decode('utf-8')), expected)
 
@@ -81,9 +83,14 @@ class TestCrud(unittest.TestCase):
                     '}'
                 '}' % os.path.join(cls.tmp_dir.name, 'test.db'))
 
-        MetaResource.initialize(config.database)
+        config.reload_config()
+        if MetaResource.db is None:
+            MetaResource.initialize(config.database)
+        else:
+            # Resources are initialized once, only the database changes.
+            MetaResource.db = config.database
         MetaResource.create_tables()
-        application = RESTServer(root_url)
+        application = RESTServer(root_url, optimize=cls.optimize)
         cls.server = WSGIMockServer(application)
         cls.saved_books = []
 
@@ -119,6 +126,24 @@ class TestCrud(unittest.TestCase):
         books = self.server.get('/api/books', '')
         self.AssertJsonEqual(books, self.saved_books)
 
+    def test_04_select_books_by_page(self):
+        books = self.server.get('/api/books', 'limit=1')
+        self.AssertJsonEqual(books, self.saved_books[:1])
+        headers = dict(self.server.start_response.call_args[0][1])
+        next_page = headers['Link'][1:headers['Link'].index('>')]
+        path, query_string = next_page.split('?')
+        books = self.server.get(path, query_string)
+        self.AssertJsonEqual(books, self.saved_books[1:])
+
+    def test_04_select_books_with_wrong_limit(self):
+        self.server.get('/api/books', 'limit=one')
+        self.AssertStatusEquals('400 Bad Request')
+
+    def test_04_select_books_with_nested_cursor(self):
+        # base64 of [[1]]
+        self.server.get('/api/books', 'limit=1&after=W1sxXV0')
+        self.AssertStatusEquals('400 Bad Request')
+
     def test_05_select_one_book(self):
         book = self.server.get('/api/books/1', '')
         self.AssertJsonEqual(book, self.saved_books[0])
@@ -128,6 +153,10 @@ class TestCrud(unittest.TestCase):
         self.AssertStatusEquals('404 Not Found')
         self.AssertJsonEqual(book, {'error': 'Resource not found'})
 
+    def test_06_select_book_with_wrong_id(self):
+        book = self.server.get('/api/books/martine', '')
+        self.AssertStatusEquals('404 Not Found')
+
     def test_07_update_books(self):
         book = dict(title='Martine go to the cinema',
                     abstract='Martine go to the cinema with Chuck Noris')
@@ -172,6 +201,10 @@ class TestCrud(unittest.TestCase):
         chapter = self.server.delete('/api/books/1/chapters/1', '')
         self.AssertJsonEqual(chapter, '')
 
+    def test_14_delete_not_existing_chapter(self):
+        self.server.delete('/api/books/1/chapters/1', '')
+        self.AssertStatusEquals('404 Not Found')
+
     def test_15_select_chapters(self):
         chapter = self.server.get('/api/books/1/chapters', '')
         expected = []
@@ -182,7 +215,83 @@ class TestCrud(unittest.TestCase):
         expected = [{"book_id": 2, "number": 1, "title": "Init"}]
         self.AssertJsonEqual(chapter, expected)
 
+    def test_17_create_chapters(self):
+        chapters = [dict(number=2, title="Middle"), dict(number=3, title="End")]
+        created = self.server.post('/api/books/2/chapters', '', json.dumps(chapters))
+        for chapter in chapters:
+            chapter['book_id'] = 2
+        self.AssertJsonEqual(created, chapters)
+
+    def test_18_select_chapters(self):
+        chapters = self.server.get('/api/books/2/chapters', '')
+        self.assertEqual(len(json.loads(chapters.decode('utf-8'))), 3)
+
+    def test_19_patch_chapter(self):
+        patched = self.server.patch('/api/books/2/chapters/3', '',
+                                    json.dumps({"title": "Conclusion"}))
+        expected = dict(book_id=2, number=3, title="Conclusion")
+        self.AssertJsonEqual(patched, expected)
+        chapter = self.server.get('/api/books/2/chapters/3', '')
+        self.AssertJsonEqual(chapter, expected)
+
+    def test_20_patch_chapter_unknown_field(self):
+        self.server.patch('/api/books/2/chapters/3', '', json.dumps({"name": "End"}))
+        self.AssertStatusEquals('400 Bad Request')
+
+    def test_20_patch_not_existing_chapter(self):
+        self.server.patch('/api/books/2/chapters/42', '', json.dumps({"title": "End"}))
+        self.AssertStatusEquals('404 Not Found')
+
+    def test_21_filter_chapters(self):
+        chapters = self.server.get('/api/books/2/chapters', 'number-ge=2&number-ne=3')
+        self.AssertJsonEqual(chapters, [{"book_id": 2, "number": 2, "title": "Middle"}])
+
+    def test_21_filter_chapters_with_in(self):
+        chapters = self.server.get('/api/books/2/chapters', 'number-in=1,3')
+        self.assertEqual([chapter['number'] for chapter in json.loads(chapters.decode('utf-8'))],
+                         [1, 3])
+
+    def test_21_filter_books_with_wrong_value(self):
+        self.server.get('/api/books', 'id-gt=one')
+        self.AssertStatusEquals('400 Bad Request')
+
+    def test_21_filter_books_with_not_filterable_field(self):
+        self.server.get('/api/books', 'title-eq=Init')
+        self.AssertStatusEquals('400 Bad Request')
+
+    def test_21_filter_chapters_with_repeated_filter(self):
+        self.server.get('/api/books/2/chapters', 'number-ge=1&number-ge=3')
+        self.AssertStatusEquals('400 Bad Request')
+
+    def test_21_filter_books_with_wrong_operator(self):
+        self.server.get('/api/books', 'id-is=1')
+        self.AssertStatusEquals('400 Bad Request')
+
+    def test_22_select_books_fields(self):
+        books = self.server.get('/api/books', 'fields=title')
+        self.AssertJsonEqual(books, [{"id": 1, "title": "Martine go to the cinema"},
+                                     {"id": 2, "title": "The life of Martine"}])
+
+    def test_22_select_one_book_fields(self):
+        book = self.server.get('/api/books/2', 'fields=chapters')
+        book = json.loads(book.decode('utf-8'))
+        self.assertEqual(sorted(book), ['chapters', 'id'])
+        self.assertEqual(len(book['chapters']), 3)
+
+    def test_22_select_chapters_fields(self):
+        chapters = self.server.get('/api/books/2/chapters', 'fields=title&number-eq=3')
+        self.AssertJsonEqual(chapters, [{"book_id": 2, "number": 3, "title": "Conclusion"}])
+
+    def test_22_select_books_unknown_fields(self):
+        self.server.get('/api/books', 'fields=title,name')
+        self.AssertStatusEquals('400 Bad Request')
+
     @classmethod
     def tearDownClass(cls):
         cls.tmp_dir.cleanup()
         os.remove('config.json')
+
+
+class TestOptimizedCrud(TestCrud):
+
+    optimize = True
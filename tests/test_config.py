@@ -8,7 +8,8 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from woof.server.config import (ConfigIsNotValidError, ChoiceValidator, IntValidator,
                                 FloatValidator, StrValidator, DictValidator, 
-                                ListValidator, TranstypingValidator, ConfigReader)
+                                ListValidator, TranstypingValidator, BoolValidator,
+                                ConfigReader)
 
 
 def stub_constructor(a, b):
@@ -29,7 +30,8 @@ class TestConfValidator(unittest.TestCase):
             'g': DictValidator(children={
                 'ga': IntValidator(),
                 'gb': IntValidator(is_required=False)
-            })
+            }),
+            'h': BoolValidator(is_required=False)
         })
 
     def setUp(self):
@@ -115,6 +117,12 @@ class TestConfValidator(unittest.TestCase):
             clean_conf = self.validator.valid(self.valid_conf)
         self.assertEqual(str(cm.exception), 'g.ga: must be an integer between -inf and inf')
 
+    def test_bool(self):
+        self.valid_conf['h'] = 'yes'
+        with self.assertRaises(ConfigIsNotValidError) as cm:
+            clean_conf = self.validator.valid(self.valid_conf)
+        self.assertEqual(str(cm.exception), 'h: must be a boolean')
+
     def test_optional(self):
         del self.valid_conf['g']['gb']
         try:
@@ -2,10 +2,13 @@
 
 import sys
 import os
+import sqlite3
+import threading
 import unittest
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from woof.db import ConnectorAdapter, MetaConnectorAdapter
+from woof.db import (ConnectorAdapter, MetaConnectorAdapter, ConnectionPool,
+                     DataBase, PoolTimeoutError)
 
 
 class TestMetaConnectorAdapter(unittest.TestCase):
@@ -47,3 +50,140 @@ class TestMetaConnectorAdapter(unittest.TestCase):
         translated_params = FooConnectorAdapter(dict(cheval=33, oiseau=42, fleur=22))
         self.assertEqual(translated_params.connection_parameters,
                          dict(horse=33, bird=42, flower=22))
+
+
+def connect():
+    return sqlite3.connect(':memory:', check_same_thread=False)
+
+
+def in_thread(function):
+    results = []
+    thread = threading.Thread(target=lambda: results.append(function()))
+    thread.start()
+    thread.join()
+    return results[0]
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def test_thread_uses_the_same_connection(self):
+        pool = ConnectionPool(connect)
+        connection = pool.checkout()
+        self.assertIs(pool.checkout(), connection)
+        pool.checkin()
+        self.assertIs(pool.checkout(), connection)
+        self.assertEqual(pool.stats()['created'], 1)
+
+    def test_threads_use_different_connections(self):
+        pool = ConnectionPool(connect)
+        connection = pool.checkout()
+        self.assertIsNot(in_thread(pool.checkout), connection)
+
+    def test_connection_of_dead_thread_is_reclaimed(self):
+        pool = ConnectionPool(connect, max_size=1, timeout=0)
+        connection = in_thread(pool.checkout)
+        self.assertIs(pool.checkout(), connection)
+        self.assertEqual(pool.stats()['reclaimed'], 1)
+
+    def test_checkout_raise_timeout_error(self):
+        pool = ConnectionPool(connect, max_size=1, timeout=0.01)
+        checked_out = threading.Event()
+        done = threading.Event()
+
+        def hold_connection():
+            pool.checkout()
+            checked_out.set()
+            done.wait()
+
+        thread = threading.Thread(target=hold_connection)
+        thread.start()
+        checked_out.wait()
+        try:
+            with self.assertRaises(PoolTimeoutError):
+                pool.checkout()
+        finally:
+            done.set()
+            thread.join()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_idle_connections_are_closed_after_timeout(self):
+        pool = ConnectionPool(connect, min_size=1, idle_timeout=0)
+        pool.checkout()
+        in_thread(pool.checkout)
+        pool.checkin()
+        in_thread(pool.checkout)
+        stats = pool.stats()
+        self.assertEqual(stats['size'], 1)
+        self.assertEqual(stats['closed'], 1)
+
+    def test_dead_connection_is_replaced(self):
+        pool = ConnectionPool(connect, ping_interval=0)
+        connection = pool.checkout()
+        pool.checkin()
+        connection.close()
+        self.assertIsNot(pool.checkout(), connection)
+        self.assertEqual(pool.stats()['created'], 2)
+
+    def test_checkin_rollbacks(self):
+        pool = ConnectionPool(connect)
+        pool.checkout().execute('CREATE TABLE t (x INTEGER)')
+        pool.checkout().execute('INSERT INTO t VALUES (1)')
+        pool.checkin()
+        self.assertEqual(pool.checkout().execute('SELECT * FROM t').fetchall(), [])
+
+    def test_wrong_sizes(self):
+        with self.assertRaises(ValueError):
+            ConnectionPool(connect, min_size=-1)
+        with self.assertRaises(ValueError):
+            ConnectionPool(connect, min_size=2, max_size=1)
+
+    def test_database_reuses_connection(self):
+        data_base = DataBase('sqlite', database=':memory:', pool={'max_size': 2})
+        data_base.execute('SELECT 1')
+        data_base.execute('SELECT 1')
+        data_base.release()
+        self.assertEqual(data_base.pool.stats()['created'], 1)
+        self.assertEqual(data_base.pool.max_size, 2)
+
+
+class TestTransaction(unittest.TestCase):
+
+    def setUp(self):
+        self.data_base = DataBase('sqlite', database=':memory:', isolation_level=None)
+        self.data_base.execute('CREATE TABLE t (x INTEGER)')
+
+    def select(self):
+        return self.data_base.execute('SELECT x FROM t').fetchall()
+
+    def test_commit(self):
+        with self.data_base.transaction():
+            self.data_base.execute('INSERT INTO t VALUES (1)')
+            self.assertTrue(self.data_base.in_transaction())
+        self.assertFalse(self.data_base.in_transaction())
+        self.data_base.release()
+        self.assertEqual(self.select(), [(1,)])
+
+    def test_rollback_on_error(self):
+        with self.assertRaises(ZeroDivisionError):
+            with self.data_base.transaction():
+                self.data_base.execute('INSERT INTO t VALUES (1)')
+                1 / 0
+        self.assertEqual(self.select(), [])
+
+    def test_nested_transaction_joins_outermost(self):
+        with self.assertRaises(ZeroDivisionError):
+            with self.data_base.transaction():
+                with self.data_base.transaction():
+                    self.data_base.execute('INSERT INTO t VALUES (1)')
+                1 / 0
+        self.assertEqual(self.select(), [])
+
+    def test_decorator(self):
+        @self.data_base.transaction()
+        def insert(x):
+            self.data_base.execute('INSERT INTO t VALUES (?)', (x,))
+            self.assertTrue(self.data_base.in_transaction())
+
+        insert(1)
+        insert(2)
+        self.assertEqual(self.select(), [(1,), (2,)])
@@ -8,6 +8,7 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from woof.resource import *
 import woof.sqltranslator
+from woof.sqltranslator import statement_cache_info
 import woof.resource
 
 
@@ -195,6 +196,124 @@ class TestFieldToSql(TestPyToSql):
             'REFERENCES res_c(id);')
 
 
+class TestQueryToSql(TestPyToSql):
+
+    def setUp(self):
+        super().setUp()
+
+        class FooBar(Resource):
+            a = IntegerField()
+            b = StringField()
+
+        MetaResource.initialize(MockedDataBase())
+        self.resource = FooBar
+
+    def test_order_by(self):
+        sql, _, _ = self.resource.select().order_by('a', '-b').get_sql()
+        self.assertEqual(sql, 'SELECT DISTINCT id, a, b FROM foo_bar '
+                              'ORDER BY foo_bar.a, foo_bar.b DESC')
+
+    def test_limit_offset(self):
+        sql, _, _ = self.resource.select().limit(10).offset(20).get_sql()
+        self.assertEqual(sql, 'SELECT DISTINCT id, a, b FROM foo_bar LIMIT 10 OFFSET 20')
+
+    def test_after(self):
+        sql, parameters, _ = self.resource.select().order_by('a', '-b').after(a=1, b='x').get_sql()
+        self.assertEqual(sql, 'SELECT DISTINCT id, a, b FROM foo_bar '
+                              'WHERE ((foo_bar.a > %s) OR (foo_bar.a = %s AND foo_bar.b < %s)) '
+                              'ORDER BY foo_bar.a, foo_bar.b DESC')
+        self.assertEqual(parameters, [1, 1, 'x'])
+
+    def test_statements_are_cached(self):
+        self.resource.select().order_by('a').get_sql()
+        before = statement_cache_info()
+        sql, _, _ = self.resource.select().order_by('a').get_sql()
+        after = statement_cache_info()
+        self.assertEqual(sql, 'SELECT DISTINCT id, a, b FROM foo_bar ORDER BY foo_bar.a')
+        for name in ('SQLTranslator.select', 'SQLTranslator.order_by'):
+            self.assertEqual(after[name].hits, before[name].hits + 1)
+            self.assertEqual(after[name].misses, before[name].misses)
+
+
+class TestCondition(TestPyToSql):
+
+    def setUp(self):
+        super().setUp()
+
+        class FooBar(Resource):
+            a = IntegerField()
+            b = StringField()
+
+        MetaResource.initialize(MockedDataBase())
+        self.resource = FooBar
+
+    def test_sql_and_params(self):
+        condition = (self.resource.a == 1) & ((self.resource.b != 'x') | (self.resource.a > 5))
+        self.assertEqual(condition.sql,
+                         '(foo_bar.a = ? AND (foo_bar.b != ? OR foo_bar.a > ?))')
+        self.assertEqual(condition.params, (1, 'x', 5))
+
+    def test_same_operators_are_flattened(self):
+        condition = (self.resource.a == 1) & (self.resource.b == 'x') & (self.resource.a < 3)
+        self.assertEqual(condition.sql, '(foo_bar.a = ? AND foo_bar.b = ? AND foo_bar.a < ?)')
+
+    def test_condition_is_abstract(self):
+        with self.assertRaises(TypeError):
+            woof.resource.Condition()
+
+    def test_condition_is_immutable(self):
+        condition = self.resource.a == 1
+        condition & (self.resource.b == 'x')
+        condition | (self.resource.b == 'y')
+        self.assertEqual(condition.sql, 'foo_bar.a = ?')
+        self.assertEqual(condition.params, (1,))
+
+    def test_key_does_not_depend_on_values(self):
+        condition_1 = (self.resource.a == 1) & (self.resource.b == 'x')
+        condition_2 = (self.resource.a == 2) & (self.resource.b == 'y')
+        condition_3 = (self.resource.a == 2) | (self.resource.b == 'y')
+        self.assertEqual(condition_1.key, condition_2.key)
+        self.assertNotEqual(condition_1.key, condition_3.key)
+        self.assertEqual(len({condition_1, condition_2}), 2)
+
+    def test_in(self):
+        condition = self.resource.a.in_([1, 2, 3])
+        self.assertEqual(condition.sql, 'foo_bar.a IN (?, ?, ?)')
+        self.assertEqual(condition.params, (1, 2, 3))
+        self.assertEqual(self.resource.a.in_([]).sql, '1 = 0')
+
+    def test_in_is_chunked(self):
+        class Translator(woof.sqltranslator.SQLTranslator):
+            max_in_values = 2
+
+        self.assertEqual(Translator.in_('foo_bar.a', 5, '?'),
+                         '(foo_bar.a IN (?, ?) OR foo_bar.a IN (?, ?) OR foo_bar.a IN (?))')
+
+    def test_between(self):
+        condition = self.resource.a.between(1, 5)
+        self.assertEqual(condition.sql, 'foo_bar.a BETWEEN ? AND ?')
+        self.assertEqual(condition.params, (1, 5))
+
+    def test_like(self):
+        condition = self.resource.b.like('ab%')
+        self.assertEqual(condition.sql, 'foo_bar.b LIKE ?')
+        self.assertEqual(condition.params, ('ab%',))
+
+    def test_is_null(self):
+        self.assertEqual(self.resource.b.is_null().sql, 'foo_bar.b IS NULL')
+        self.assertEqual(self.resource.b.is_null(False).sql, 'foo_bar.b IS NOT NULL')
+        self.assertEqual(self.resource.b.is_null().params, ())
+
+    def test_join_params(self):
+        sql, parameters, _ = (self.resource.select()
+                              .join(self.resource, on=self.resource.a == 3)
+                              .where(self.resource.b == 'x')
+                              .get_sql())
+        self.assertEqual(sql, 'SELECT DISTINCT id, a, b FROM foo_bar '
+                              'INNER JOIN foo_bar ON foo_bar.a = ? WHERE foo_bar.b = ?')
+        self.assertEqual(parameters, [3, 'x'])
+
+
 class TestComposedByCardinality(unittest.TestCase):
 
     def assertExecute(self, sql):
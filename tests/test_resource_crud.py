@@ -4,9 +4,11 @@ import sys
 import os
 import unittest
 from datetime import date
+from unittest.mock import patch
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from woof.resource import *
+import woof.resource
 from woof.db import IntegrityError
 from woof.db import DataBase
 
@@ -82,6 +84,10 @@ class TestCrudLoyaltyCardSchema(TestLoyaltyCardSchema):
         self.assertEqual(customer.name, "George")
         self.assertEqual(customer.loyalty_card, {'id': 2})
 
+    def test_07_10_prefetch_loyalty_card(self):
+        customers = self.Customer.prefetch(self.Customer.select(), 'loyalty_card')
+        self.assertEqual(customers[0].loyalty_card, {'id': 2})
+
     def test_08_select_card(self):
         cards = self.LoyaltyCard.select()
         card = list(cards)[1]
@@ -159,6 +165,14 @@ class TestCrudCarWheelSchema(TestCarWheelSchema):
         self.assertEqual(car.name, "Bombo")
         self.assertCountEqual(car.wheels, [{'id': 1}, {'id': 2}])
 
+    def test_07_10_prefetch_wheels(self):
+        car = list(self.Car.select().prefetch('wheels'))[0]
+        self.assertCountEqual(car.wheels, [{'id': 1}, {'id': 2}])
+
+    def test_07_20_prefetch_through_wheels(self):
+        with self.assertRaises(ValueError):
+            list(self.Car.select().prefetch('wheels__car_ref'))
+
     def test_08_remove_whells_to_car(self):
         cars = self.Car.select()
         car = list(cars)[0]
@@ -176,6 +190,8 @@ class TestCrudCarWheelSchema(TestCarWheelSchema):
 
 class TestWithHotelSchema(unittest.TestCase):
 
+    compact = False
+
     @classmethod
     def setUpClass(cls):
         MetaResource.clear()
@@ -185,14 +201,23 @@ class TestWithHotelSchema(unittest.TestCase):
             address = StringField()
             rooms = ComposedBy('Room')
 
+            class Meta:
+                compact = cls.compact
+
         class Room(Resource):
             number = IntegerField(weak_id=True)
             bed_count = IntegerField()
 
+            class Meta:
+                compact = cls.compact
+
         class Person(Resource):
             first_name = StringField()
             last_name = StringField()
 
+            class Meta:
+                compact = cls.compact
+
         @association(
             Person='0..n',
             Room='0..n'
@@ -201,12 +226,14 @@ class TestWithHotelSchema(unittest.TestCase):
             date = DateField(primary_key=True)
             nb_night = IntegerField()
 
+            class Meta:
+                compact = cls.compact
+
         cls.Hotel = Hotel
         cls.Room = Room
         cls.Person = Person
         cls.Rent = Rent
 
-
         data_base = DataBase('sqlite', database=':memory:', isolation_level=None)
         MetaResource.initialize(data_base)
         MetaResource.create_tables()
@@ -260,6 +287,40 @@ class TestCrud(TestWithHotelSchema):
         with self.assertRaises(StopIteration):
             hotel = next(loop)
 
+    def test_02_30_iter_on_select_hotel_by_batch(self):
+        for batch_size in (1, 2, 3):
+            hotels = list(self.Hotel.select().batch(batch_size))
+            self.assertEqual([hotel.id for hotel in hotels], [1, 2])
+            self.assertEqual(hotels[1].name, 'Tokio Hotel')
+
+    def test_02_40_batch_size_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            self.Hotel.select().batch(0)
+
+    def test_02_50_order_by(self):
+        hotels = list(self.Hotel.select().order_by('-name'))
+        self.assertEqual([hotel.id for hotel in hotels], [2, 1])
+
+    def test_02_60_limit_and_offset(self):
+        hotels = list(self.Hotel.select().order_by('id').limit(1))
+        self.assertEqual([hotel.id for hotel in hotels], [1])
+        hotels = list(self.Hotel.select().order_by('id').offset(1))
+        self.assertEqual([hotel.id for hotel in hotels], [2])
+
+    def test_02_70_after(self):
+        hotels = list(self.Hotel.select().after(id=1))
+        self.assertEqual([hotel.id for hotel in hotels], [2])
+        hotels = list(self.Hotel.select().order_by('-id').after(id=2))
+        self.assertEqual([hotel.id for hotel in hotels], [1])
+
+    def test_02_80_after_expects_ordering_fields(self):
+        with self.assertRaises(ValueError):
+            list(self.Hotel.select().order_by('name', 'id').after(id=1))
+
+    def test_02_90_order_by_unknown_field(self):
+        with self.assertRaises(ValueError):
+            self.Hotel.select().order_by('horse')
+
     def test_03_select_hotel_where(self):
         hotels = list(self.Hotel.select().where(self.Hotel.name == 'Hotel California'))
         self.assertEqual(len(hotels), 1)
@@ -298,6 +359,25 @@ class TestCrud(TestWithHotelSchema):
         self.assertEqual(rooms[0].bed_count, 1)
         self.assertEqual(rooms[1].bed_count, 4)
 
+    def test_06_10_prefetch_rooms_of_hotels(self):
+        with patch.object(MetaResource.db, 'execute',
+                          wraps=MetaResource.db.execute) as execute:
+            hotels = list(self.Hotel.select().prefetch('rooms'))
+            rooms = [[room.bed_count for room in hotel.rooms]
+                     for hotel in hotels]
+        self.assertEqual(rooms, [[3, 2], [1, 4]])
+        self.assertEqual(execute.call_count, 2)
+
+    def test_06_20_prefetch_rooms_by_batch(self):
+        hotels = [hotel.to_dict() for hotel
+                  in self.Hotel.select().batch(1).prefetch('rooms')]
+        self.assertEqual(hotels, [hotel.to_dict() for hotel
+                                  in self.Hotel.select()])
+
+    def test_06_30_prefetch_unknown_field(self):
+        with self.assertRaises(ValueError):
+            self.Hotel.select().prefetch('name')
+
     def test_07_create_person(self):
         self.Person(first_name='Claude', last_name='Monet').save()
         self.Person(first_name='Vincent', last_name='Van Gogh').save()
@@ -313,6 +393,25 @@ class TestCrud(TestWithHotelSchema):
         self.assertEqual(persons[1].first_name, 'Vincent')
         self.assertEqual(persons[1].last_name, 'Van Gogh')
 
+    def test_08_10_values_of_person(self):
+        self.assertEqual(list(self.Person.select().values()),
+                         [person.to_dict() for person in self.Person.select()])
+
+    def test_08_20_values_of_selected_fields(self):
+        self.assertEqual(list(self.Person.select('last_name').values()),
+                         [{'last_name': 'Monet'}, {'last_name': 'Van Gogh'}])
+
+    def test_08_30_tuples_of_person(self):
+        self.assertEqual(list(self.Person.select().where(self.Person.id == 2).tuples()),
+                         [(2, 'Vincent', 'Van Gogh')])
+
+    def test_08_40_after_with_composed_key(self):
+        rooms = list(self.Room.select()
+                     .order_by('hotel_id', 'number')
+                     .after(hotel_id=1, number=2))
+        self.assertEqual([(room.hotel_id, room.number) for room in rooms],
+                         [(2, 1), (2, 2)])
+
     def test_09_person_rent_room(self):
         self.Rent(
             date=date(2015, 11, 3),
@@ -333,6 +432,20 @@ class TestCrud(TestWithHotelSchema):
         self.assertEqual(result, [('2015-11-03', 4, 1, 1, 2),
                                   ('2015-11-04', 14, 2, 2, 1)])
 
+    def test_10_00_values_are_converted(self):
+        self.assertEqual(
+            list(self.Rent.select('date', 'nb_night').values()),
+            [{'date': date(2015, 11, 3), 'nb_night': 4},
+             {'date': date(2015, 11, 4), 'nb_night': 14}])
+
+    def test_10_01_rows_are_decoded_once(self):
+        rents = list(self.Rent.select('date', 'nb_night'))
+        self.assertEqual(rents[0]._state['date'], date(2015, 11, 3))
+        self.assertEqual(rents[0].date, date(2015, 11, 3))
+        decoder = woof.resource._row_decoder(self.Rent, ('date', 'nb_night'))
+        self.assertEqual(decoder(('2015-11-03', None)), (date(2015, 11, 3), None))
+        self.assertIs(decoder, woof.resource._row_decoder(self.Rent, ('date', 'nb_night')))
+
     def test_10_create_rent_raise_integrity_error(self):
         with self.assertRaises(IntegrityError):
             self.Rent(
@@ -417,6 +530,28 @@ class TestCrud(TestWithHotelSchema):
         room = list(renting[0].room_ref)[0]
         self.assertEqual(room.bed_count, 1)
 
+    def test_13_10_prefetch_rooms_rented_by_persons(self):
+        with patch.object(MetaResource.db, 'execute',
+                          wraps=MetaResource.db.execute) as execute:
+            persons = list(self.Person.select().prefetch('rent_set__room_ref'))
+            rooms = [[room.bed_count
+                      for rent in person.rent_set
+                      for room in rent.room_ref]
+                     for person in persons]
+        self.assertEqual(rooms, [[2], [1]])
+        self.assertEqual(execute.call_count, 3)
+
+    def test_13_20_prefetch_composite_keys_by_chunk(self):
+        expected = [[rent.nb_night for rent in room.rent_set] for room in self.Room.select()]
+        with patch.object(MetaResource.db.sql_translator, 'max_parameters', 5), \
+                patch.object(MetaResource.db, 'execute',
+                             wraps=MetaResource.db.execute) as execute:
+            rooms = list(self.Room.select().prefetch('rent_set'))
+            rents = [[rent.nb_night for rent in room.rent_set] for room in rooms]
+        # 2 keys of 2 values by statement.
+        self.assertEqual(execute.call_count, 1 + (len(rooms) + 1) // 2)
+        self.assertEqual(rents, expected)
+
     def test_14_delete_persons_raise_integrity_error(self):
         person1, person2 = self.Person.select()
         with self.assertRaises(IntegrityError):
@@ -464,6 +599,143 @@ class TestCrud(TestWithHotelSchema):
         self.assertEqual(list(self.Hotel.select()), [])
 
 
+class TestSetBasedOperations(TestWithHotelSchema):
+
+    def test_01_bulk_create_persons(self):
+        with patch.object(MetaResource.db, 'execute',
+                          wraps=MetaResource.db.execute) as execute:
+            persons = self.Person.bulk_create(
+                [dict(first_name='Claude', last_name='Monet'),
+                 self.Person(first_name='Vincent', last_name='Van Gogh'),
+                 dict(first_name='Paul', last_name='Gauguin')],
+                batch_size=2)
+        self.assertEqual(execute.call_count, 2)
+        self.assertEqual([person.id for person in persons], [1, 2, 3])
+        self.assertEqual(
+            MetaResource.db.execute('SELECT id, last_name FROM person;').fetchall(),
+            [(1, 'Monet'), (2, 'Van Gogh'), (3, 'Gauguin')])
+
+    def test_02_bulk_create_is_atomic(self):
+        with self.assertRaises(IntegrityError):
+            self.Person.bulk_create([dict(first_name='Paul', last_name='Cezanne'),
+                                     dict(first_name='Edgar')])
+        self.assertEqual(len(list(self.Person.select())), 3)
+
+    def test_03_bulk_create_with_wrong_field(self):
+        with self.assertRaises(TypeError):
+            self.Person.bulk_create([dict(name='Degas')])
+
+    def test_04_filter_update(self):
+        count = self.Person.filter(self.Person.id > 1).update(first_name='Unknown')
+        self.assertEqual(count, 2)
+        self.assertEqual([person.first_name for person in self.Person.select()],
+                         ['Claude', 'Unknown', 'Unknown'])
+
+    def test_05_filter_update_unknown_field(self):
+        with self.assertRaises(ValueError):
+            self.Person.filter(self.Person.id > 1).update(name='Unknown')
+
+    def test_06_filter_delete(self):
+        count = self.Person.filter(self.Person.first_name == 'Unknown').delete()
+        self.assertEqual(count, 2)
+        self.assertEqual([person.id for person in self.Person.select()], [1])
+
+    def test_07_filter_delete_with_limit(self):
+        with self.assertRaises(ValueError):
+            self.Person.filter(self.Person.id > 1).limit(1).delete()
+
+    def test_08_update_modified_fields(self):
+        person = list(self.Person.select())[0]
+        person.first_name = 'Claude'
+        person.last_name = 'Debussy'
+        with patch.object(MetaResource.db, 'execute',
+                          wraps=MetaResource.db.execute) as execute:
+            person.update()
+        sql, values = execute.call_args[0]
+        self.assertEqual(sql, 'UPDATE person SET last_name = ? WHERE id == ?')
+        self.assertEqual(values, ['Debussy', 1])
+
+    def test_09_update_without_modification(self):
+        person = list(self.Person.select())[0]
+        with patch.object(MetaResource.db, 'execute',
+                          wraps=MetaResource.db.execute) as execute:
+            person.update()
+            person.first_name = 'Achille'
+            person.update()
+            person.update()
+        self.assertEqual(execute.call_count, 1)
+
+    def test_10_filter_with_operators(self):
+        self.Person.bulk_create([dict(first_name='Paul', last_name='Gauguin'),
+                                 dict(first_name='Edgar', last_name='Degas'),
+                                 dict(first_name='Berthe', last_name='Morisot_')])
+        self.assertEqual([person.last_name for person in self.Person.filter(
+            self.Person.last_name.like('%is%'))], ['Morisot_'])
+        self.assertEqual([person.last_name for person in self.Person.filter(
+            self.Person.last_name.like('%\\_'))], ['Morisot_'])
+        self.assertEqual([person.id for person in self.Person.filter(
+            self.Person.id.between(2, 3))], [2, 3])
+        self.assertEqual(list(self.Person.filter(self.Person.first_name.is_null())), [])
+
+    def test_11_large_in_is_split(self):
+        ids = list(range(1, 9)) * 2
+        with patch.object(MetaResource.db.sql_translator, 'max_parameters', 3), \
+                patch.object(MetaResource.db, 'execute',
+                             wraps=MetaResource.db.execute) as execute:
+            persons = list(self.Person.filter(self.Person.id.in_(ids)).batch(2))
+            self.assertEqual(execute.call_count, 3)
+            count = (self.Person.filter(self.Person.id.in_(ids) &
+                                        (self.Person.first_name != 'Paul'))
+                     .update(last_name='Unknown'))
+        self.assertEqual(sorted(person.id for person in persons), [1, 2, 3, 4])
+        self.assertEqual(count, 3)
+
+
+class TestCompactCrud(TestCrud):
+
+    compact = True
+
+    def test_00_state_is_compact(self):
+        hotel = self.Hotel(name="Hotel California")
+        self.assertNotIsInstance(hotel._state, dict)
+        self.assertFalse(hasattr(hotel._state, '__dict__'))
+        self.assertEqual(dict(hotel._state), {'name': 'Hotel California'})
+        self.assertEqual(hotel._modified, {'name'})
+
+    def test_00_instances_are_slotted(self):
+        hotel = self.Hotel(name="Hotel California")
+        self.assertIsInstance(hotel, self.Hotel)
+        self.assertFalse(hasattr(hotel, '__dict__'))
+        with self.assertRaises(AttributeError):
+            hotel.stars = 5
+
+    def test_02_95_loaded_instances_are_slotted(self):
+        hotels = list(self.Hotel.select().prefetch('rooms'))
+        self.assertTrue(hotels)
+        for hotel in hotels:
+            self.assertIsInstance(hotel, self.Hotel)
+            self.assertFalse(hasattr(hotel, '__dict__'))
+            self.assertFalse(hasattr(hotel._state, '__dict__'))
+
+
+class TestCompactSetBasedOperations(TestSetBasedOperations):
+
+    compact = True
+
+    def test_state_factory_is_reset(self):
+        self.Person.Meta.compact = False
+        try:
+            MetaResource._set_instance_layout()
+            woof.resource._state_builder.cache_clear()
+            self.assertIs(self.Person._state_factory, dict)
+            self.assertIsInstance(self.Person(first_name='Claude')._state, dict)
+            self.assertIsInstance(next(iter(self.Person.select()))._state, dict)
+        finally:
+            self.Person.Meta.compact = True
+            MetaResource._set_instance_layout()
+            woof.resource._state_builder.cache_clear()
+
+
 class TestResourceToDict(TestWithHotelSchema):
 
     def test_hotel_to_dict(self):
@@ -493,3 +765,7 @@ class TestResourceToDict(TestWithHotelSchema):
             )]
         )
         self.assertEqual(hotel.to_dict(), expected)
+
+    def test_hotel_with_selected_fields_to_dict(self):
+        hotel = list(self.Hotel.select('id', 'name'))[0]
+        self.assertEqual(hotel.to_dict(['id', 'name']), dict(id=1, name="Tokio Hotel"))
@@ -1,10 +1,19 @@
 import sys
 import os
 import unittest
+from unittest.mock import Mock, patch
 import tempfile
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from io import BytesIO
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from woof.server.server import traceback_to_dict
+from woof.db import DataBase
+from woof.errors import ControllerError, NotFoundError
+from woof.resource import MetaResource, Resource, StringField, IntegerField, ComposedBy
+from woof.server.server import traceback_to_dict, RESTServer, JSON_ENCODERS, get_json_encoder
+from woof.url import EntryPoint
 
 
 def raise_exc():
@@ -69,3 +78,292 @@ class TestTracebackToDict(unittest.TestCase):
     def test_implicitly_context_args(self):
         self.assertEqual(self.implicitly_tb['context']['args'], ('error_msg', 'error_num'))
 
+
+
+class TestStreamingResponse(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        root = EntryPoint('/api')
+
+        @root.get('/numbers/{count:int}')
+        def get_numbers(count):
+            return ({'number': number} for number in range(count))
+
+        @root.get('/broken')
+        def get_broken():
+            return (1 / number for number in range(1))
+
+        cls.server = RESTServer(root, stream_batch_size=2)
+
+    def get(self, path):
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': ''}
+        self.status = None
+
+        def start_response(status, headers):
+            self.status = status
+
+        return list(self.server(environ, start_response))
+
+    def test_chunks(self):
+        chunks = self.get('/api/numbers/5')
+        self.assertEqual(self.status, '200 OK')
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(json.loads(b''.join(chunks).decode('utf-8')),
+                         [{'number': number} for number in range(5)])
+
+    def test_chunks_equal_encoded_list(self):
+        expected = [{'number': number} for number in range(5)]
+        for name in JSON_ENCODERS:
+            try:
+                self.server.json_encoder = get_json_encoder(name)
+            except ImportError:
+                continue
+            with self.subTest(encoder=name):
+                self.assertEqual(b''.join(self.get('/api/numbers/5')),
+                                 self.server.json_encoder.dumps(expected))
+        self.server.json_encoder = get_json_encoder()
+
+    def test_empty(self):
+        self.assertEqual(self.get('/api/numbers/0'), [b'[]'])
+
+    def test_batch_size(self):
+        # 7 resources by 3 give 3 batches and the closing bracket.
+        self.server.stream_batch_size = 3
+        try:
+            chunks = self.get('/api/numbers/7')
+        finally:
+            self.server.stream_batch_size = 2
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual([chunk.count(b'{') for chunk in chunks], [3, 3, 1, 0])
+        self.assertEqual(json.loads(b''.join(chunks).decode('utf-8')),
+                         [{'number': number} for number in range(7)])
+
+    def test_error_in_first_batch(self):
+        self.get('/api/broken')
+        self.assertEqual(self.status, '500 Internal Server Error')
+
+
+class TestControllerError(unittest.TestCase):
+
+    class ConflictError(ControllerError):
+        pass
+
+    @classmethod
+    def setUpClass(cls):
+        root = EntryPoint('/api')
+
+        @root.get('/missing')
+        def get_missing():
+            raise NotFoundError()
+
+        @root.get('/conflict')
+        def get_conflict():
+            raise cls.ConflictError('conflict')
+
+        cls.server = RESTServer(root)
+
+    def get(self, path):
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': ''}
+        response = {}
+
+        def start_response(status, headers):
+            response['status'] = status
+
+        response['body'] = json.loads(b''.join(self.server(environ, start_response)).decode('utf-8'))
+        return response
+
+    def test_mapped_error(self):
+        self.assertEqual(self.get('/api/missing'),
+                         {'status': '404 Not Found', 'body': {'error': 'Not Found'}})
+
+    def test_unmapped_error(self):
+        self.assertEqual(self.get('/api/conflict'),
+                         {'status': '500 Internal Server Error', 'body': {'error': 'conflict'}})
+
+
+class TestJSONEncoder(unittest.TestCase):
+
+    def encoders(self):
+        for name in JSON_ENCODERS:
+            try:
+                yield get_json_encoder(name)
+            except ImportError:
+                pass
+
+    def test_encode(self):
+        values = {'date': date(2015, 11, 3), 'datetime': datetime(2015, 11, 3, 10, 30),
+                  'decimal': Decimal('1.500'), 'list': [1, 2.5, 'é', None, True]}
+        expected = {'date': '2015-11-03', 'datetime': '2015-11-03T10:30:00',
+                    'decimal': '1.500', 'list': [1, 2.5, 'é', None, True]}
+        for encoder in self.encoders():
+            encoded = encoder.dumps(values)
+            self.assertIsInstance(encoded, bytes)
+            self.assertEqual(json.loads(encoded.decode('utf-8')), expected)
+
+    def test_encoders_give_same_values(self):
+        values = [{'id': 1, 'day': date(2015, 11, 3), 'price': Decimal('2.50'),
+                   'created': datetime(2015, 11, 3, 10, 30, 5, 120),
+                   'tags': ('a', Decimal('1')), 'nested': {'price': Decimal('0.001')}}]
+        expected = json.loads(get_json_encoder('json').dumps(values).decode('utf-8'))
+        self.assertEqual(expected[0]['price'], '2.50')
+        for encoder in self.encoders():
+            with self.subTest(encoder=type(encoder).__name__):
+                self.assertEqual(json.loads(encoder.dumps(values).decode('utf-8')), expected)
+
+    def test_unknown_type(self):
+        for encoder in self.encoders():
+            with self.assertRaises(TypeError):
+                encoder.dumps({'set': {1, 2}})
+
+    def test_unknown_encoder(self):
+        with self.assertRaises(ValueError):
+            get_json_encoder('pickle')
+
+    def test_default_encoder_is_installed(self):
+        self.assertIsInstance(get_json_encoder(), tuple(JSON_ENCODERS.values()))
+
+
+class TestTransactionPerRequest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        MetaResource.clear()
+
+        class Note(Resource):
+            text = StringField()
+
+        MetaResource.initialize(DataBase('sqlite', database=':memory:'))
+        MetaResource.create_tables()
+
+        root = EntryPoint('/api')
+
+        @root.post('/notes')
+        def post_notes(body):
+            for text in body:
+                Note(text=text).save()
+            return body
+
+        cls.Note = Note
+        cls.server = RESTServer(root)
+
+    def post(self, path, body):
+        body = json.dumps(body).encode('utf-8')
+        environ = {'REQUEST_METHOD': 'POST', 'PATH_INFO': path, 'QUERY_STRING': '',
+                   'CONTENT_LENGTH': str(len(body)), 'wsgi.input': BytesIO(body)}
+        self.status = None
+
+        def start_response(status, headers):
+            self.status = status
+
+        return list(self.server(environ, start_response))
+
+    def test_statements_are_committed(self):
+        self.post('/api/notes', ['first', 'second'])
+        self.assertEqual(self.status, '200 Created')
+        self.assertEqual([note.text for note in self.Note.select()],
+                         ['first', 'second'])
+
+    def test_statements_are_rolled_back_on_error(self):
+        self.post('/api/notes', ['third', None])
+        self.assertEqual(self.status, '409 Conflict')
+        self.assertNotIn('third', [note.text for note in self.Note.select()])
+
+
+class TestOptimize(unittest.TestCase):
+    """
+    Optimized controllers must return the same responses as
+    the controllers generated by EntryPoint.crud.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        MetaResource.clear()
+
+        class Hotel(Resource):
+            name = StringField()
+            rooms = ComposedBy('Room')
+
+        class Room(Resource):
+            number = IntegerField(weak_id=True)
+            floor = IntegerField()
+            beds = ComposedBy('Bed')
+
+        class Bed(Resource):
+            number = IntegerField(weak_id=True)
+            size = IntegerField()
+
+        class Letter(Resource):
+            dict = StringField(primary_key=True)  # used by generated controllers.
+            text = StringField()
+
+        roots = [EntryPoint('/api'), EntryPoint('/api')]
+        for root in roots:
+            root.crud('/letters/[dict]', Letter)
+            root.crud('/hotels/[id]', Hotel)
+            root.crud('/hotels/{hotel_id}/rooms/[number]', Room)
+            root.crud('/hotels/{room_hotel_id}/rooms/{room_number}/beds/[number]', Bed)
+
+        MetaResource.initialize(DataBase('sqlite', database=':memory:'))
+        MetaResource.create_tables()
+        cls.server = RESTServer(roots[0])
+        cls.optimized_server = RESTServer(roots[1], optimize=True)
+
+    def request(self, server, method, path, body=None):
+        body = b'' if body is None else json.dumps(body).encode('utf-8')
+        environ = {'REQUEST_METHOD': method, 'PATH_INFO': path, 'QUERY_STRING': '',
+                   'CONTENT_LENGTH': str(len(body)), 'wsgi.input': BytesIO(body)}
+        response = {}
+
+        def start_response(status, headers):
+            response['status'] = status
+
+        response['body'] = json.loads(b''.join(server(environ, start_response)).decode('utf-8'))
+        return response
+
+    def assertSameResponse(self, method, path, body=None):
+        expected = self.request(self.server, method, path, body)
+        optimized = self.request(self.optimized_server, method, path, body)
+        self.assertEqual(optimized, expected)
+        return optimized
+
+    def test_controllers_are_optimized(self):
+        for url_tree in (self.optimized_server.get_urls, self.optimized_server.post_urls,
+                         self.optimized_server.put_urls, self.optimized_server.del_urls):
+            for controller, _ in url_tree.get_controllers():
+                self.assertEqual(type(controller).__name__, 'function')
+
+    def test_composed_resources(self):
+        hotel = self.request(self.optimized_server, 'POST', '/api/hotels', {'name': 'Ritz'})
+        self.assertEqual(hotel['body'], {'id': 1, 'name': 'Ritz', 'rooms': []})
+        self.request(self.server, 'POST', '/api/hotels', {'name': 'Plaza'})
+        for hotel_id, number in ((1, 1), (1, 2), (2, 1)):
+            self.request(self.optimized_server, 'POST',
+                         '/api/hotels/{}/rooms'.format(hotel_id), {'number': number, 'floor': 1})
+        for hotel_id, room, number, size in ((1, 1, 1, 140), (1, 1, 2, 90), (2, 1, 1, 160)):
+            self.request(self.optimized_server, 'POST',
+                         '/api/hotels/{}/rooms/{}/beds'.format(hotel_id, room),
+                         {'number': number, 'size': size})
+
+        hotels = self.assertSameResponse('GET', '/api/hotels')
+        self.assertEqual(hotels['body'][0]['rooms'][0]['beds'][1],
+                         {'room_hotel_id': 1, 'room_number': 1, 'number': 2, 'size': 90})
+        self.assertSameResponse('GET', '/api/hotels/1')
+        self.assertSameResponse('GET', '/api/hotels/3')
+        self.assertSameResponse('GET', '/api/hotels/1/rooms')
+        self.assertSameResponse('GET', '/api/hotels/1/rooms/1/beds/2')
+        self.assertSameResponse('PUT', '/api/hotels/2', {'name': 'Plaza Athenee'})
+        self.assertSameResponse('PUT', '/api/hotels/1/rooms/1/beds/2', {'number': 2, 'size': 100})
+        # Beds of rooms, whose key has 2 columns, are selected one room at a time.
+        with patch.object(MetaResource.db.sql_translator, 'max_parameters', 2):
+            self.assertSameResponse('GET', '/api/hotels')
+
+    def test_parameters_named_like_variables(self):
+        letter = self.request(self.optimized_server, 'POST', '/api/letters',
+                              {'dict': 'hello', 'text': 'greeting'})
+        self.assertEqual(letter['body'], {'dict': 'hello', 'text': 'greeting'})
+        ctrl, _ = self.optimized_server.put_urls.get('/api/letters/hello')
+        with patch.dict(ctrl.__globals__, _fallback=Mock(side_effect=AssertionError)):
+            self.assertSameResponse('PUT', '/api/letters/hello', {'text': 'welcome'})
+        self.assertSameResponse('GET', '/api/letters/hello')
+        self.assertSameResponse('GET', '/api/letters')
@@ -5,7 +5,7 @@ import os
 import unittest
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from woof.url import EntryPoint, URLPathTree
+from woof.url import EntryPoint, URLPathTree, RegexRouter, encode_cursor, decode_cursor
 
 
 def hotels():
@@ -26,6 +26,9 @@ def persons(person_id):
 def person(person_id):
     ...
 
+def delete_hotel(id):
+    ...
+
 
 class TestURLPathTree(unittest.TestCase):
 
@@ -101,6 +104,190 @@ class TestURLPathTree(unittest.TestCase):
             expected)
 
 
+class TestCompiledURLPathTree(TestURLPathTree):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.url_path_tree.compile()
+
+    def test_literal_is_preferred_to_parameter(self):
+        url_path_tree = URLPathTree()
+        url_path_tree.add("/person/me", persons)
+        url_path_tree.add("/person/{person_id}", person)
+        url_path_tree.compile()
+        self.assertEqual(url_path_tree.get("/person/me"), (persons, {}))
+        self.assertEqual(url_path_tree.get("/person/you"),
+                         (person, {'person_id': 'you'}))
+
+    def test_backtrack_to_parameter(self):
+        url_path_tree = URLPathTree()
+        url_path_tree.add("/hotel/new", hotels)
+        url_path_tree.add("/hotel/{hotel_id}/room", rooms)
+        url_path_tree.compile()
+        self.assertEqual(url_path_tree.get("/hotel/new/room"),
+                         (rooms, {'hotel_id': 'new'}))
+
+    def test_add_after_compile(self):
+        url_path_tree = URLPathTree()
+        url_path_tree.add("/hotel", hotels)
+        url_path_tree.compile()
+        url_path_tree.add("/hotel/{id}", hotel)
+        self.assertEqual(url_path_tree.get("/hotel/3"), (hotel, {'id': '3'}))
+
+    def test_replace_controller_after_compile(self):
+        url_path_tree = URLPathTree()
+        url_path_tree.add("/hotel", hotels)
+        url_path_tree.compile()
+        url_path_tree.replace_controller(hotels, persons)
+        self.assertEqual(url_path_tree.get("/hotel"), (persons, {}))
+
+
+class TestTypedParameter(unittest.TestCase):
+
+    def setUp(self):
+        self.url_path_tree = URLPathTree()
+        self.url_path_tree.add("/hotel/{id:int}", hotel)
+        self.url_path_tree.add("/hotel/{hotel_id:int}/room/{room_id:float}", room)
+        self.url_path_tree.add("/person/{person_id}", person)
+
+    def assertGet(self, url, expected):
+        self.assertEqual(self.url_path_tree.get(url), expected)
+        self.url_path_tree.compile()
+        self.assertEqual(self.url_path_tree.get(url), expected)
+
+    def assertNotFound(self, url):
+        with self.assertRaises(LookupError):
+            self.url_path_tree.get(url)
+        self.url_path_tree.compile()
+        with self.assertRaises(LookupError):
+            self.url_path_tree.get(url)
+
+    def test_int_parameter_is_converted(self):
+        self.assertGet("/hotel/-42", (hotel, {'id': -42}))
+
+    def test_float_parameter_is_converted(self):
+        self.assertGet("/hotel/4/room/2.5", (room, {'hotel_id': 4, 'room_id': 2.5}))
+
+    def test_wrong_int_parameter(self):
+        self.assertNotFound("/hotel/california")
+
+    def test_empty_int_parameter(self):
+        self.assertNotFound("/hotel/")
+
+    def test_str_parameter(self):
+        self.assertGet("/person/42", (person, {'person_id': '42'}))
+
+    def test_same_template_with_other_type(self):
+        self.url_path_tree.add("/hotel/{id}", delete_hotel)
+        self.assertGet("/hotel/42", (hotel, {'id': 42}))
+        self.assertGet("/hotel/california", (delete_hotel, {'id': 'california'}))
+
+    def test_typed_template_after_str_template(self):
+        self.url_path_tree.add("/person/{person_id:int}", persons)
+        self.assertGet("/person/martin", (person, {'person_id': 'martin'}))
+
+    def test_literal_after_parameter(self):
+        self.url_path_tree.add("/person/me", hotels)
+        self.assertGet("/person/me", (hotels, {}))
+        self.assertGet("/person/martin", (person, {'person_id': 'martin'}))
+
+    def test_cannot_add_existing_typed_url(self):
+        with self.assertRaises(ValueError):
+            self.url_path_tree.add("/hotel/{hotel_id:int}", hotel)
+
+    def test_unknown_type(self):
+        with self.assertRaises(ValueError):
+            self.url_path_tree.add("/hotel/{id:horse}/room", rooms)
+
+    def test_set_parameter_type(self):
+        self.url_path_tree.set_parameter_type("/person/{person_id}", "person_id", "int")
+        self.assertGet("/person/42", (person, {'person_id': 42}))
+        self.assertNotFound("/person/martin")
+
+    def test_regex_router(self):
+        root = EntryPoint()
+        root.get_urls = self.url_path_tree
+        router = RegexRouter(root)
+        self.assertEqual(router.get('GET', '/hotel/4/room/2.5'),
+                         (room, {'hotel_id': 4, 'room_id': 2.5}))
+        with self.assertRaises(LookupError):
+            router.get('GET', '/hotel/california')
+
+
+class TestURLPathTreeCache(unittest.TestCase):
+
+    def setUp(self):
+        self.url_path_tree = URLPathTree(cache_size=2)
+        self.url_path_tree.add("/hotel/{id}", hotel)
+        self.url_path_tree.add("/person/{person_id}", person)
+
+    def test_hit_returns_new_parameters(self):
+        ctrl, parameters = self.url_path_tree.get("/hotel/1")
+        parameters['id'] = 'changed'
+        self.assertEqual(self.url_path_tree.get("/hotel/1"), (hotel, {'id': '1'}))
+        self.assertEqual(self.url_path_tree.cache_hits, 1)
+        self.assertEqual(self.url_path_tree.cache_misses, 1)
+
+    def test_least_recently_used_is_evicted(self):
+        self.url_path_tree.get("/hotel/1")
+        self.url_path_tree.get("/hotel/2")
+        self.url_path_tree.get("/hotel/1")
+        self.url_path_tree.get("/hotel/3")
+        self.url_path_tree.get("/hotel/1")
+        self.assertEqual(self.url_path_tree.cache_hits, 2)
+        self.url_path_tree.get("/hotel/2")
+        self.assertEqual(self.url_path_tree.cache_misses, 4)
+
+    def test_not_found_is_not_cached(self):
+        for _ in range(2):
+            with self.assertRaises(LookupError):
+                self.url_path_tree.get("/horse")
+        self.assertEqual(self.url_path_tree.cache_hits, 0)
+
+    def test_replace_controller_clears_cache(self):
+        self.url_path_tree.get("/hotel/1")
+        self.url_path_tree.replace_controller(hotel, room)
+        self.assertEqual(self.url_path_tree.get("/hotel/1"), (room, {'id': '1'}))
+
+    def test_add_clears_cache(self):
+        self.url_path_tree.get("/hotel/1")
+        self.url_path_tree.add("/hotel/{hotel_id}/room", rooms)
+        self.url_path_tree.get("/hotel/1")
+        self.assertEqual(self.url_path_tree.cache_hits, 0)
+
+    def test_path_found_before_clear_isnt_cached(self):
+        lookup = self.url_path_tree._lookup
+
+        def lookup_then_clear(url):
+            found = lookup(url)
+            self.url_path_tree.clear_cache()
+            return found
+
+        self.url_path_tree._lookup = lookup_then_clear
+        self.url_path_tree.get("/hotel/1")
+        self.assertEqual(len(self.url_path_tree._cache), 0)
+
+
+class TestCursor(unittest.TestCase):
+
+    def test_decode_encoded_values(self):
+        self.assertEqual(decode_cursor(encode_cursor([2, 'a']), 2), [2, 'a'])
+
+    def test_wrong_number_of_values(self):
+        with self.assertRaises(ValueError):
+            decode_cursor(encode_cursor([2, 'a']), 1)
+
+    def test_values_must_be_scalar(self):
+        for values in ([[2]], [{'id': 2}], [None]):
+            with self.assertRaises(ValueError):
+                decode_cursor(encode_cursor(values), 1)
+
+    def test_not_a_cursor(self):
+        with self.assertRaises(ValueError):
+            decode_cursor('not a cursor', 1)
+
+
 class TestEntryPoint(unittest.TestCase):
 
     @classmethod
@@ -126,6 +313,10 @@ class TestEntryPoint(unittest.TestCase):
         @root.delete('/hotel/{id}')
         def del_hotel(id):
             return 4
+
+        @root.patch('/hotel/{id}')
+        def patch_hotel(id):
+            return 5
         
         cls.root = root
 
@@ -150,3 +341,50 @@ class TestEntryPoint(unittest.TestCase):
     def test_del(self):
         ctrl, params = self.root.del_urls.get('/api/hotel/55')
         self.assertEqual(ctrl(params['id']), 4)
+
+    def test_patch(self):
+        ctrl, params = self.root.patch_urls.get('/api/hotel/12')
+        self.assertEqual(ctrl(params['id']), 5)
+
+
+class TestRegexRouter(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        root = EntryPoint('/api')
+        root.get('/hotel')(hotels)
+        root.get('/hotel/{id}')(hotel)
+        root.get('/hotel/{hotel_id}/room')(rooms)
+        root.get('/hotel/{hotel_id}/room/{room_id}')(room)
+        root.get('/person/me')(persons)
+        root.get('/person/{person_id}')(person)
+        root.delete('/hotel/{id}')(delete_hotel)
+        cls.router = RegexRouter(root)
+
+    def test_get_static(self):
+        self.assertEqual(self.router.get('GET', '/api/hotel'), (hotels, {}))
+
+    def test_get_parameters(self):
+        self.assertEqual(self.router.get('GET', '/api/hotel/33/room/42'),
+                         (room, {'hotel_id': '33', 'room_id': '42'}))
+
+    def test_get_empty_parameter(self):
+        self.assertEqual(self.router.get('GET', '/api/hotel//room'),
+                         (rooms, {'hotel_id': ''}))
+
+    def test_literal_is_preferred_to_parameter(self):
+        self.assertEqual(self.router.get('GET', '/api/person/me'), (persons, {}))
+        self.assertEqual(self.router.get('GET', '/api/person/you'),
+                         (person, {'person_id': 'you'}))
+
+    def test_method_selects_controller(self):
+        self.assertEqual(self.router.get('DELETE', '/api/hotel/3'),
+                         (delete_hotel, {'id': '3'}))
+
+    def test_wrong_method(self):
+        with self.assertRaises(LookupError):
+            self.router.get('PUT', '/api/hotel/3')
+
+    def test_wrong_url(self):
+        with self.assertRaises(LookupError):
+            self.router.get('GET', '/api/hotel/3/horse')
@@ -28,7 +28,7 @@ from woof.resource import MetaResource
 
 MetaResource.initialize(config.database)
 
-application = RESTServer(root_url)
+application = RESTServer(root_url, **getattr(config, 'server', {{}}))
 """.lstrip().format(var_name=config.ENVIRON_VAR_NAME,
                     conf_file_name=config.DEFAULT_FILE_NAME)
 
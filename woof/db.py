@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 from .sqltranslator import MetaSQLTranslator
 
+from collections import deque
+from decimal import Decimal
+import datetime
+import functools
 import threading
 import importlib
 import os
+import time
 
 
 class Error(Exception):
@@ -83,11 +88,203 @@ PEP_249_ERROR = {
 }
 
 
+class PoolTimeoutError(OperationalError):
+    """
+    Exception raised when no connection of the pool is released
+    before the timeout.
+    """
+
+
+class ConnectionPool:
+    """
+    Bounded pool of database connections shared by threads.
+
+    A thread checks out a connection at its first query and uses it until
+    it checks it in, RESTServer checks in the connection at the end of each
+    request. Connections of dead threads are reclaimed.
+
+    connect - callable returning a new connection.
+    min_size - number of connections kept open even if they are idle.
+    max_size - maximum number of open connections.
+    idle_timeout - seconds after which an idle connection is closed
+                   unless the pool would have less than min_size connections.
+    ping_interval - connections idle for more than ping_interval seconds
+                    are checked by ping_query before being checked out.
+    timeout - seconds to wait a connection when max_size connections are used.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, idle_timeout=300.0,
+                 ping_interval=30.0, ping_query='SELECT 1', timeout=30.0):
+        if min_size < 0:
+            raise ValueError('min_size must be positive')
+        if max_size < max(min_size, 1):
+            raise ValueError('max_size must be greater than 0 and min_size')
+
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self.ping_query = ping_query
+        self.timeout = timeout
+
+        self._idle = deque()  # [(connection, checked in time), ...]
+        self._used = {}  # {thread: connection}
+        self._lock = threading.Condition()
+        self._closed = False
+        self._counters = dict(created=0, closed=0, checkouts=0,
+                              reclaimed=0, waits=0, timeouts=0)
+
+    def __len__(self):
+        return len(self._idle) + len(self._used)
+
+    def checkout(self):
+        """
+        Return the connection of the current thread.
+        """
+        thread = threading.current_thread()
+        connection = self._used.get(thread)
+        if connection is not None:
+            return connection
+
+        deadline = time.monotonic() + self.timeout
+        with self._lock:
+            while True:
+                self._reclaim()
+                connection = self._pop_idle()
+                if connection is None and len(self) < self.max_size:
+                    connection = self.connect()
+                    self._counters['created'] += 1
+
+                if connection is not None:
+                    self._used[thread] = connection
+                    self._counters['checkouts'] += 1
+                    return connection
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        'no connection released within {} seconds'.format(self.timeout))
+                self._counters['waits'] += 1
+                self._lock.wait(remaining)
+
+    def checkin(self):
+        """
+        Give back the connection of the current thread to the pool.
+        Uncommitted changes are rolled back.
+        """
+        with self._lock:
+            connection = self._used.pop(threading.current_thread(), None)
+            if connection is not None:
+                self._push_idle(connection)
+                self._lock.notify()
+
+    def close(self):
+        """
+        Close idle connections, used connections are closed when they are checked in.
+        """
+        with self._lock:
+            while self._idle:
+                self._close(self._idle.popleft()[0])
+            self._closed = True
+
+    def stats(self):
+        """
+        Return dict of pool counters and of current numbers of connections.
+        """
+        with self._lock:
+            stats = dict(self._counters, size=len(self), idle=len(self._idle),
+                         used=len(self._used), max_size=self.max_size)
+        return stats
+
+    def _pop_idle(self):
+        """
+        Return the most recently used idle connection which is alive or None.
+        Connections idle for too long are closed.
+        """
+        now = time.monotonic()
+        while self._idle and len(self) > self.min_size \
+                and now - self._idle[0][1] > self.idle_timeout:
+            self._close(self._idle.popleft()[0])
+
+        while self._idle:
+            connection, checked_in = self._idle.pop()
+            if now - checked_in <= self.ping_interval or self._ping(connection):
+                return connection
+            self._close(connection)
+        return None
+
+    def _push_idle(self, connection):
+        try:
+            connection.rollback()
+        except Exception:
+            self._close(connection)
+        else:
+            if self._closed:
+                self._close(connection)
+            else:
+                self._idle.append((connection, time.monotonic()))
+
+    def _reclaim(self):
+        """
+        Check in connections of dead threads.
+        """
+        dead_threads = [thread for thread in self._used if not thread.is_alive()]
+        for thread in dead_threads:
+            self._push_idle(self._used.pop(thread))
+            self._counters['reclaimed'] += 1
+
+    def _ping(self, connection):
+        try:
+            connection.cursor().execute(self.ping_query)
+        except Exception:
+            return False
+        return True
+
+    def _close(self, connection):
+        self._counters['closed'] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+class Transaction:
+    """
+    Context manager and decorator grouping statements executed by the
+    current thread in one transaction. The transaction is committed when
+    the outermost block exits without error and rolled back otherwise.
+    Nested blocks join the outermost transaction.
+    """
+
+    def __init__(self, database):
+        self.database = database
+
+    def __enter__(self):
+        self.database._begin()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.database._end(exc_type is None)
+        return False
+
+    def __call__(self, function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with self.database.transaction():
+                return function(*args, **kwargs)
+        return wrapper
+
+
 class DataBase:
-    def __init__(self, provider, **connection_parameters):
+    """
+    pool - dict of ConnectionPool parameters.
+    """
+
+    def __init__(self, provider, pool=None, **connection_parameters):
         self.provider = provider
         self.connector = None
-        self.pool = {}
 
         try:
             connector_adapter = MetaConnectorAdapter.PROVIDERS[provider]
@@ -99,11 +296,72 @@ class DataBase:
         self.module = importlib.import_module(connector_adapter.PROVIDER_MODULE)
         self.connector = self.module.connect
         self.error = self.module.Error
+        self.connector_adapter = connector_adapter
         self.connection_parameters = connector_adapter(connection_parameters).connection_parameters
+        self.pool = ConnectionPool(self.connect, **(pool or {}))
+        self._local = threading.local()
+
+    def connect(self):
+        """
+        Open a new connection to the database.
+        """
+        return self.connector(**self.connection_parameters)
+
+    def release(self):
+        """
+        Give back the connection used by the current thread to the pool.
+        A transaction in progress is rolled back.
+        """
+        self._local.depth = 0
+        self.pool.checkin()
+
+    def transaction(self):
+        """
+        Return a Transaction usable by with statement or as decorator:
+
+            with db.transaction():
+                ...
+
+            @db.transaction()
+            def function():
+                ...
+        """
+        return Transaction(self)
+
+    def in_transaction(self):
+        """
+        Return True if the current thread is in a transaction block.
+        """
+        return getattr(self._local, 'depth', 0) > 0
+
+    def _begin(self):
+        depth = getattr(self._local, 'depth', 0)
+        if not depth:
+            self._call(self.connector_adapter.begin, self.pool.checkout())
+        self._local.depth = depth + 1
+
+    def _end(self, commit):
+        self._local.depth -= 1
+        if not self._local.depth:
+            connection = self.pool.checkout()
+            if commit:
+                try:
+                    self._call(connection.commit)
+                except Error:
+                    connection.rollback()
+                    raise
+            else:
+                self._call(connection.rollback)
+
+    def _call(self, function, *args):
+        try:
+            return function(*args)
+        except self.error as error:
+            cls_error = PEP_249_ERROR[type(error).__name__]
+            raise cls_error(*error.args)
 
     def execute(self, sql_query, parameters=()):
-        connection = self.pool.setdefault(threading.current_thread(),
-                                          self.connector(**self.connection_parameters))
+        connection = self.pool.checkout()
         cursor = connection.cursor()
         if not hasattr(cursor, 'connection'):
             cursor.connection = connection
@@ -173,7 +431,23 @@ class ConnectorAdapter(metaclass=MetaConnectorAdapter):
     The keys are the standards names such as (database, host, port, user, password ...) and
     the values are translated name to connect function parameters. A value can be a callable or
     unbound static or class method which translate parameters.
+
+    FIXED_ARGS is a dict of parameters always given to the connect function.
+
+    NATIVE_TYPES is a set of python types the connector returns in rows
+    and which need no conversion.
     """
+
+    FIXED_ARGS = {}
+    NATIVE_TYPES = frozenset()
+
+    @staticmethod
+    def begin(connection):
+        """
+        Start a transaction on connection. By default, DB-API connectors
+        start it implicitly with the first statement.
+        """
+
     def __init__(self, connection_parameters):
         self.connection_parameters = self.translate_kwargs(connection_parameters)
 
@@ -201,6 +475,7 @@ class ConnectorAdapter(metaclass=MetaConnectorAdapter):
                     translated_name(parameters[std_name]))
             else:
                 translated_kwargs[translated_name] = parameters[std_name]
+        translated_kwargs.update(cls.FIXED_ARGS)
         for std_name, translated_name in cls.OPTIONAL_ARGS.items():
             if std_name in parameters:
                 translated_kwargs[translated_name] = parameters[std_name]
@@ -222,8 +497,17 @@ class SqliteConnectorAdapter(ConnectorAdapter):
     OPTIONAL_ARGS = {'timeout': 'timeout',
                      'cached_statements': 'cached_statements',
                      'isolation_level': 'isolation_level'}
+    # Connections are shared by threads of the pool.
+    FIXED_ARGS = {'check_same_thread': False}
+    NATIVE_TYPES = frozenset((int, float, str, bytes))
     PROVIDER_MODULE = 'sqlite3'
 
+    @staticmethod
+    def begin(connection):
+        # sqlite3 doesn't start transaction when isolation_level is None.
+        if not connection.in_transaction:
+            connection.execute('BEGIN')
+
 
 class MysqlConnectorAdapter(ConnectorAdapter):
     EXPECTED_ARGS = {'host': 'host',
@@ -232,6 +516,8 @@ class MysqlConnectorAdapter(ConnectorAdapter):
                      'password': 'password',
                      'database': 'db'}
     OPTIONAL_ARGS = {'charset': 'charset'}
+    NATIVE_TYPES = frozenset((int, float, str, bytes, Decimal,
+                              datetime.date, datetime.datetime))
     PROVIDER_MODULE = 'pymysql'
 
 
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+#-*- coding:utf-8 -*-
+
+"""
+Errors raised by controllers, RESTServer answers them with an HTTP status.
+"""
+
+
+class ControllerError(Exception):
+    pass
+
+
+class NotFoundError(ControllerError):
+    """
+    The requested resource doesn't exist.
+    """
+
+    def __init__(self, msg='Not Found'):
+        super().__init__(msg)
+
+
+class BadRequestError(ControllerError):
+    """
+    The request isn't valid, msg explains why.
+    """
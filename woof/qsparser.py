@@ -1,17 +1,88 @@
 #!/usr/bin/env python3
 #-*- coding:utf-8 -*-
 
-import operator
-
-def build_filter(entity, query_string):
-    iqs = iter(query_string)
-    k, v = next(iqs)
-    field, ope = k.split('-')
-    
-    expression = getattr(operator, ope)(getattr(entity, field), v)
-    
-    for k, v in iqs:
-        field, ope = k.split('-')
-        expression = expression & (getattr(operator, ope)(getattr(entity, field), v))
-    return expression
+"""
+Build a Condition from query string parameters such as ?name-eq=Martine&id-gt=10
+"""
 
+from .resource import ScalarField, and_
+
+OPERATORS = {
+    # operator in query string: function building the condition
+    'eq': lambda column, value: column == value,
+    'ne': lambda column, value: column != value,
+    'lt': lambda column, value: column < value,
+    'le': lambda column, value: column <= value,
+    'gt': lambda column, value: column > value,
+    'ge': lambda column, value: column >= value,
+    'in': lambda column, values: column.in_(values),
+    'like': lambda column, pattern: column.like(pattern),
+    'null': lambda column, is_null: column.is_null(is_null),
+}
+
+
+def filterable_fields(resource):
+    """
+    Return names of fields of resource which can be used in filters.
+
+    Only the fields likely to be indexed can be used: id fields, foreign keys,
+    unique fields and the first field of the fields unique together.
+    Meta.filterable gives other field names.
+    """
+    names = set(resource._id_fields_names)
+    for foreign_key in resource.Meta.foreign_keys:
+        names.update(foreign_key.fields)
+    for fields in resource.Meta.uniques:
+        names.add(fields[0])
+    names.update(field.name for field in resource._fields if field.unique)
+    names.update(resource.Meta.filterable)
+    return names
+
+
+def _convert(field, operator, value):
+    if operator == 'null':
+        if value not in ('true', 'false'):
+            raise ValueError("'{}-null' must be true or false".format(field.name))
+        return value == 'true'
+
+    if operator == 'like':
+        return value
+
+    factory = field.to_py_factory
+    try:
+        if operator == 'in':
+            return [factory(item) for item in value.split(',')]
+        return factory(value)
+    except (TypeError, ValueError, ArithmeticError):
+        raise ValueError("'{}' isn't a valid value for '{}'".format(value, field.name))
+
+
+def build_filter(resource, query_string, filterable=None):
+    """
+    Return a Condition from query string parameters or None if
+    there is no parameter.
+
+    query_string - iterable of 2-tuple ('<field_name>-<op>', '<value>')
+                   op is a key of OPERATORS, values are converted with
+                   to_py_factory of the field.
+    filterable - names of fields which can be used, by default all fields.
+
+    Raise ValueError if a parameter isn't valid.
+    """
+    fields = {field.name: field for field in resource._fields}
+    conditions = []
+    for key, value in query_string:
+        field_name, _, operator = key.rpartition('-')
+        if operator not in OPERATORS:
+            raise ValueError("'{}' isn't a valid filter".format(key))
+        field = fields.get(field_name)
+        if not isinstance(field, ScalarField) or (
+                filterable is not None and field_name not in filterable):
+            raise ValueError("'{}' can't be used to filter".format(field_name))
+
+        conditions.append(OPERATORS[operator](getattr(resource, field_name),
+                                              _convert(field, operator, value)))
+
+    if not conditions:
+        return None
+    return and_(*conditions)
@@ -1,7 +1,12 @@
+from abc import ABC, abstractmethod
 from collections import OrderedDict
+from collections.abc import Mapping, MutableMapping
+import copy
 import datetime
 from decimal import Decimal
+import functools
 from .db import DataBase
+from .sqltranslator import STATEMENT_CACHE_SIZE, SQLTranslator
 from .names_manipulation import to_underscore
 
 
@@ -41,6 +46,9 @@ class MetaResource(type):
                 required_resource_for_pk = []
                 association_meta_data = []
                 uniques = [] # List of field list unique together.
+                filterable = [] # Names of fields usable in query string filters.
+                composed = False
+                compact = False # Slotted instances and field values, set in the class body.
         """
         if not hasattr(cls, 'Meta'):
             cls.Meta = type('Meta', (), {})
@@ -50,17 +58,27 @@ class MetaResource(type):
                      'weak_id',
                      'uniques',
                      'required_resource_for_pk',
-                     'association_meta_data'):
+                     'association_meta_data',
+                     'filterable'):
 
             if not hasattr(cls.Meta, attr):
                 setattr(cls.Meta, attr, [])
 
-        if not hasattr(cls.Meta, 'composed'):
-            cls.Meta.composed = False
+        for attr in ('composed', 'compact'):
+            if not hasattr(cls.Meta, attr):
+                setattr(cls.Meta, attr, False)
+
+    def __new__(mcs, name, parent, attrs):
+        if getattr(attrs.get('Meta'), 'compact', False):
+            # Instances are created from the slotted class of _instance_class.
+            attrs['__slots__'] = ()
+            attrs['__new__'] = _new_compact_instance
+        return super().__new__(mcs, name, parent, attrs)
 
     def __init__(cls, name, parent, attrs):
         if name != 'Resource':
             MetaResource._starting_block[name] = cls
+            cls._instance_class = cls
             cls._init_nested_meta()
             cls._table_name = to_underscore(cls.__name__)
             cls._fields = []
@@ -148,11 +166,13 @@ class MetaResource(type):
                                    other_resource._id_fields_names)
                     )
 
-                    setattr(other_resource, resource._table_name + '_set',
-                            ToAssociationField(resource))
+                    to_association = ToAssociationField(resource)
+                    to_association.name = resource._table_name + '_set'
+                    setattr(other_resource, to_association.name, to_association)
 
-                    setattr(resource, other_resource._table_name + '_ref',
-                            FromAssociationField(other_resource))
+                    from_association = FromAssociationField(other_resource)
+                    from_association.name = other_resource._table_name + '_ref'
+                    setattr(resource, from_association.name, from_association)
 
             for field in resource._fields:
                 if isinstance(field, ComposedBy):
@@ -274,6 +294,19 @@ class MetaResource(type):
                 resource._table_name, resource.Meta.foreign_keys, resource.Meta.uniques):
                 mcs.db.execute(sql)
 
+    @classmethod
+    def _set_instance_layout(mcs):
+        """
+        Set _state_factory and _instance_class of resources from Meta.compact.
+        """
+        for resource in MetaResource._starting_block.values():
+            if resource.Meta.compact:
+                resource._state_factory = _compact_state_class(resource)
+            else:
+                resource._state_factory = dict
+            if '__slots__' in vars(resource):
+                resource._instance_class = _compact_instance_class(resource)
+
     @classmethod
     def initialize(mcs, database):
         if not isinstance(database, DataBase):
@@ -288,13 +321,20 @@ class MetaResource(type):
 
         mcs._generate_weak_id_if_not_exist()
         mcs._generate_primary_key_if_not_exist()
+        _selected_field_names.cache_clear()  # fields have been added.
+        _row_decoder.cache_clear()
+        _state_builder.cache_clear()
         for resource in MetaResource._starting_block.values():
             resource._id_fields_names = tuple(e[0] for e in mcs.get_id_fields_names(resource))
         mcs._set_meta_foreign_key()
+        mcs._set_instance_layout()
         mcs._set_register()
         mcs._name_to_ref()
         mcs.db = database
 
+        for resource, _ in mcs.register.values():
+            _row_decoder(resource, _selected_field_names(resource, ()))
+
         for callback in mcs.on_initialized:
             callback()
         mcs.on_initialized = []
@@ -305,6 +345,9 @@ class MetaResource(type):
         mcs.fields_types = {}
         mcs._resource_fields = []
         mcs._starting_block = {}
+        _selected_field_names.cache_clear()
+        _row_decoder.cache_clear()
+        _state_builder.cache_clear()
 
 
 class ForeignKey:
@@ -328,76 +371,557 @@ NotSelectedField = NotSelectedField()
 
 
 class Query:
+    """
+    SELECT query on a resource.
+
+    Rows are fetched from the DB-API cursor by batch of batch_size rows
+    in order to reduce calls to the database driver. Use batch() method
+    to change the batch size of a query.
+    """
+
+    batch_size = 100
+
     class Cursor:
-        def __init__(self, cursor, resource, field_names):
+        def __init__(self, cursor, resource, field_names, batch_size=1, prefetch_paths=()):
             """
             cursor - DB-API cursor object
             resource - Resource sub-class
             field_name - names of field used in select sql query
+            batch_size - number of rows fetched at once
+            prefetch_paths - paths of related fields loaded for each batch
             """
             self._cursor = cursor
             self._resource = resource
             self._selected_field_names = field_names
-            self._d = {field.name: NotSelectedField
-                       for field
-                       in self._resource._fields
-                       if isinstance(field, ScalarField)}
+            self._decode_row = _row_decoder(resource, tuple(field_names))
+            self._new_state = _state_builder(resource, tuple(field_names))
+            self._instance_class = resource._instance_class
+            self._batch_size = batch_size
+            self._prefetch_paths = prefetch_paths
+            self._instances = iter(())
+
+        def __iter__(self):
+            return self
 
         def __next__(self):
-            values = self._cursor.fetchone()
-            if values is None:
-                raise StopIteration()
-            self._d.update(dict(zip(self._selected_field_names, values)))
-            return self._resource(**self._d)
+            instance = next(self._instances, None)
+            if instance is None:
+                rows = self._cursor.fetchmany(self._batch_size)
+                if not rows:
+                    raise StopIteration()
+                instances = [self._new_instance(values) for values in rows]
+                if self._prefetch_paths:
+                    self._resource.prefetch(instances, *self._prefetch_paths)
+                self._instances = iter(instances)
+                instance = next(self._instances)
+            return instance
+
+        def _new_instance(self, values):
+            # Values come from database, Resource.__init__ checks are useless.
+            state = self._new_state(self._decode_row(values))
+            instance = object.__new__(self._instance_class)
+            instance._state = state
+            instance._modified = _UNMODIFIED
+            return instance
 
     def __init__(self, resource, fields):
         self.resource = resource
         self.join_criteria = []
         self.where_criteria = None
         self.selected_fields = fields
+        self.ordering = []  # [(field name, descending), ...]
+        self.limit_value = None
+        self.offset_value = None
+        self.last_key = None
+        self.prefetch_paths = []
+
+    def batch(self, batch_size):
+        """
+        Set number of rows fetched at once.
+        """
+        if batch_size < 1:
+            raise ValueError('batch_size must be greater than 0')
+        self.batch_size = batch_size
+        return self
 
     def join(self, resource, on):
-        self.join_criteria.append((resource, on.sql))
+        self.join_criteria.append((resource, on))
         return self
 
     def where(self, criteria):
         self.where_criteria = criteria
         return self
 
+    def order_by(self, *field_names):
+        """
+        Sort rows using field names. Prefix a field name with '-'
+        to use descending order.
+        """
+        self.ordering = []
+        for field_name in field_names:
+            descending = field_name.startswith('-')
+            field_name = field_name.lstrip('-')
+            self._check_field_name(field_name)
+            self.ordering.append((field_name, descending))
+        return self
+
+    def limit(self, limit):
+        """
+        Select at most limit rows.
+        """
+        if limit < 0:
+            raise ValueError('limit must be positive')
+        self.limit_value = limit
+        return self
+
+    def offset(self, offset):
+        """
+        Skip offset rows. Prefer after() on large tables because
+        the database still reads skipped rows.
+        """
+        if offset < 0:
+            raise ValueError('offset must be positive')
+        self.offset_value = offset
+        return self
+
+    def after(self, **last_key):
+        """
+        Select rows after the row having values of last_key (keyset pagination).
+
+        Fields of order_by() are used as key, they must be all given.
+        Without order_by(), rows are sorted by the fields of last_key
+        in the order of the resource fields.
+        """
+        for field_name in last_key:
+            self._check_field_name(field_name)
+        self.last_key = last_key
+        return self
+
+    def prefetch(self, *paths):
+        """
+        Load related resources of fields named by paths with one query
+        per batch of rows instead of one query per row.
+
+        Use '__' to prefetch related resources of related resources,
+        for example: Hotel.select().prefetch('rooms__beds')
+        """
+        self.resource._related_fields(paths)
+        self.prefetch_paths.extend(paths)
+        return self
+
+    def _check_field_name(self, field_name):
+        if not any(field.name == field_name and isinstance(field, ScalarField)
+                   for field in self.resource._fields):
+            raise ValueError("{} has no field '{}'"
+                             .format(self.resource.__name__, field_name))
+
     def get_sql(self):
-        if self.selected_fields:
-            field_names = [field.name
-                           for field in self.resource._fields
-                           if isinstance(field, ScalarField)
-                           and field.name in self.selected_fields]
+        field_names = _selected_field_names(self.resource, tuple(self.selected_fields))
+        sql_translator = type(self.resource).db.sql_translator
+        sql = sql_translator.select(self.resource._table_name, field_names)
+
+        user_input = []
+        for resource, criteria in self.join_criteria:
+            sql += " INNER JOIN {} ON {}".format(resource._table_name, criteria.sql)
+            user_input.extend(criteria.params)
+
+        table_name = self.resource._table_name
+        ordering = self.ordering
+        if self.last_key is not None and not ordering:
+            ordering = [(field.name, False)
+                        for field in self.resource._fields
+                        if field.name in self.last_key]
+
+        criteria = []
+        if self.where_criteria is not None:
+            criteria.append(self.where_criteria.sql)
+            user_input.extend(self.where_criteria.params)
+
+        if self.last_key is not None:
+            if set(self.last_key) != set(name for name, _ in ordering):
+                raise ValueError('after() expects values of {}'
+                                 .format(', '.join(name for name, _ in ordering)))
+            columns = [('{}.{}'.format(table_name, name), descending)
+                       for name, descending in ordering]
+            criteria.append(sql_translator.keyset(columns))
+            for position in range(len(ordering)):
+                user_input.extend(self.last_key[name] for name, _ in ordering[:position + 1])
+
+        if criteria:
+            sql += " WHERE {}".format(' AND '.join(criteria))
+
+        if ordering:
+            sql += sql_translator.order_by(
+                [('{}.{}'.format(table_name, name), descending)
+                 for name, descending in ordering])
+
+        if self.limit_value is not None or self.offset_value:
+            sql += sql_translator.limit(self.limit_value, self.offset_value)
+
+        return sql, user_input, list(field_names)
+
+    def _check_set_based(self, operation):
+        if self.join_criteria or self.limit_value is not None \
+                or self.offset_value or self.last_key is not None:
+            raise ValueError("{}() can't be used with join(), limit(), offset() or after()"
+                             .format(operation))
+
+    def _split_where(self, nb_parameters):
+        """
+        Return a list of where criteria selecting the rows of where_criteria
+        so that a statement having nb_parameters parameters is split in
+        statements having at most max_parameters of the translator.
+
+        The largest in_() list of where_criteria is split in chunks, it
+        must be the where criteria or an operand of an AND where criteria.
+        """
+        criteria = self.where_criteria
+        max_parameters = type(self.resource).db.sql_translator.max_parameters
+        if nb_parameters <= max_parameters:
+            return [criteria]
+
+        if isinstance(criteria, In):
+            operands = (criteria,)
+        elif isinstance(criteria, BoolOp) and criteria.operator == 'AND':
+            operands = criteria.operands
         else:
-            field_names = [field.name
-                           for field in self.resource._fields
-                           if isinstance(field, ScalarField)]
+            return [criteria]
 
-        sql = "SELECT DISTINCT {} FROM {}".format(
-            ', '.join(field_names), self.resource._table_name)
+        in_lists = [operand for operand in operands if isinstance(operand, In)]
+        if not in_lists:
+            return [criteria]
 
-        for resource, criteria in self.join_criteria:
-            sql += " INNER JOIN {} ON {}".format(resource._table_name, " ".join(criteria))
+        largest = max(in_lists, key=lambda in_list: len(in_list.values))
+        chunk_size = max_parameters - (nb_parameters - len(largest.values))
+        if chunk_size < 1:
+            return [criteria]
+
+        values = list(OrderedDict.fromkeys(largest.values))
+        return [and_(*(In(largest.operand, values[start:start + chunk_size])
+                       if operand is largest else operand
+                       for operand in operands))
+                for start in range(0, len(values), chunk_size)]
+
+    def delete(self):
+        """
+        Delete rows matching the where criteria with one statement
+        and return the number of deleted rows.
+        """
+        self._check_set_based('delete')
+        db = type(self.resource).db
+        criteria = self.where_criteria
+        nb_parameters = 0 if criteria is None else len(criteria.params)
+
+        count = 0
+        with db.transaction():
+            for criteria in self._split_where(nb_parameters):
+                user_input = []
+                sql_criteria = None
+                if criteria is not None:
+                    sql_criteria = criteria.sql
+                    user_input.extend(criteria.params)
+                sql = db.sql_translator.delete_where(self.resource._table_name, sql_criteria)
+                count += db.execute(sql, user_input).rowcount
+        return count
+
+    def update(self, **values):
+        """
+        Set values of fields on rows matching the where criteria with
+        one statement and return the number of updated rows.
+        """
+        self._check_set_based('update')
+        if not values:
+            raise ValueError('update() expects at least one field value')
+        for field_name in values:
+            self._check_field_name(field_name)
+
+        db = type(self.resource).db
+        criteria = self.where_criteria
+        nb_parameters = len(values) + (0 if criteria is None else len(criteria.params))
+
+        count = 0
+        with db.transaction():
+            for criteria in self._split_where(nb_parameters):
+                user_input = list(values.values())
+                sql_criteria = None
+                if criteria is not None:
+                    sql_criteria = criteria.sql
+                    user_input.extend(criteria.params)
+                sql = db.sql_translator.update_where(self.resource._table_name,
+                                                     list(values), sql_criteria)
+                count += db.execute(sql, user_input).rowcount
+        return count
+
+    def execute(self):
+        """
+        Return a cursor on selected rows and names of selected fields,
+        use it to read raw rows without creating resources.
 
-        user_input = ()
-        if self.where_criteria:
-            sql += " WHERE {}".format(' '.join(self.where_criteria.sql))
-            user_input = self.where_criteria.user_input
+        If the query has too many parameters because of an in_() list,
+        the list is split and the cursor reads the rows of each statement.
+        Queries using order_by(), limit(), offset() or after() aren't split.
+        """
+        db = type(self.resource).db
+        sql, user_input, field_names = self.get_sql()
+        if self.ordering or self.limit_value is not None \
+                or self.offset_value or self.last_key is not None:
+            return db.execute(sql, user_input), field_names
 
-        return sql, user_input, field_names
+        where_chunks = self._split_where(len(user_input))
+        if len(where_chunks) == 1:
+            return db.execute(sql, user_input), field_names
+
+        statements = []
+        for criteria in where_chunks:
+            query = copy.copy(self)
+            query.where_criteria = criteria
+            statements.append(query.get_sql()[:2])
+        return _ChainedCursor(db, statements), field_names
 
     def __iter__(self):
-        sql, user_input, field_names = self.get_sql()
-        cursor = type(self.resource).db.execute(sql, user_input)
-        return self.Cursor(cursor, self.resource, field_names)
+        cursor, field_names = self.execute()
+        return self.Cursor(cursor, self.resource, field_names,
+                           self.batch_size, self.prefetch_paths)
+
+    def _converted_rows(self):
+        """
+        Return names of selected fields and generator of rows where values
+        are converted by to_py_factory of fields with the row decoder of
+        the resource.
+        """
+        cursor, field_names = self.execute()
+        decode_row = _row_decoder(self.resource, tuple(field_names))
+        batch_size = self.batch_size
+
+        def rows():
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    return
+                yield from map(decode_row, batch)
+
+        return field_names, rows()
+
+    def tuples(self):
+        """
+        Yield tuples of values of selected fields without creating resources.
+        Values are in the same order as fields in the resource.
+        """
+        field_names, rows = self._converted_rows()
+        return rows
+
+    def values(self):
+        """
+        Yield dicts of values of selected fields without creating resources.
+        The dicts are equal to Resource.to_dict() of a resource having only
+        scalar fields.
+        """
+        field_names, rows = self._converted_rows()
+        return (dict(zip(field_names, row)) for row in rows)
+
+
+class _ChainedCursor:
+    """
+    Cursor reading the rows of statements one after the other,
+    a statement is executed when rows of the previous one are read.
+    """
+
+    def __init__(self, db, statements):
+        self._db = db
+        self._statements = iter(statements)
+        self._cursor = None
+
+    def fetchmany(self, size):
+        while True:
+            if self._cursor is not None:
+                rows = self._cursor.fetchmany(size)
+                if rows:
+                    return rows
+            statement = next(self._statements, None)
+            if statement is None:
+                return []
+            self._cursor = self._db.execute(*statement)
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _selected_field_names(resource, selected_fields):
+    """
+    Return names of scalar fields of resource in selected_fields
+    or of all scalar fields if selected_fields is empty.
+    """
+    return tuple(field.name
+                 for field in resource._fields
+                 if isinstance(field, ScalarField)
+                 and (not selected_fields or field.name in selected_fields))
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _row_decoder(resource, field_names):
+    """
+    Return a function converting a row of values of field_names read
+    from the database to a tuple of values given by to_py_factory.
+
+    The function is generated once per resource and field names, values
+    whose type is returned as is by the database driver aren't converted.
+    """
+    connector_adapter = getattr(MetaResource.db, 'connector_adapter', None)
+    native_types = getattr(connector_adapter, 'NATIVE_TYPES', ())
+    fields = {field.name: field for field in resource._fields}
+    namespace = {}
+    values = []
+    for position, field_name in enumerate(field_names):
+        field = fields[field_name]
+        if field.py_type in native_types:
+            values.append('row[{}]'.format(position))
+        else:
+            namespace['convert_{}'.format(position)] = field.to_py_factory
+            values.append('None if row[{0}] is None else convert_{0}(row[{0}])'
+                          .format(position))
+
+    src = 'def decode_row(row):\n    return ({})\n'.format(
+        ''.join(value + ', ' for value in values))
+    exec(compile(src, '<{} row decoder>'.format(resource.__name__), 'exec'), namespace)
+    return namespace['decode_row']
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _state_builder(resource, field_names):
+    """
+    Return a function creating the _state of a resource from a tuple of
+    decoded values of field_names, other scalar fields are NotSelectedField.
+
+    The function is generated once per resource and field names, it
+    builds a dict literal or sets slots of a compact state.
+    """
+    scalar_names = [field.name for field in resource._fields
+                    if isinstance(field, ScalarField)]
+    namespace = {'NotSelectedField': NotSelectedField, 'State': resource._state_factory}
+    if resource._state_factory is dict:
+        items = ('{!r}: values[{}]'.format(name, field_names.index(name))
+                 if name in field_names else '{!r}: NotSelectedField'.format(name)
+                 for name in scalar_names)
+        src = 'def new_state(values):\n    return {{{}}}\n'.format(', '.join(items))
+    else:
+        slot_names = resource._state_factory._slot_names
+        lines = ['state = State()']
+        if field_names:
+            lines.append('{}, = values'.format(
+                ', '.join('state.' + slot_names[name] for name in field_names)))
+        lines.extend('state.{} = NotSelectedField'.format(slot_names[name])
+                     for name in scalar_names if name not in field_names)
+        lines.append('return state')
+        src = 'def new_state(values):\n{}'.format(
+            ''.join('    {}\n'.format(line) for line in lines))
+    exec(compile(src, '<{} state builder>'.format(resource.__name__), 'exec'), namespace)
+    return namespace['new_state']
+
+
+class _CompactState(MutableMapping):
+    """
+    Values of fields of a resource stored in slots named by field position,
+    used instead of a dict as _state of resources whose Meta.compact is True.
+
+    A field isn't in the state while its slot isn't set.
+    """
+
+    __slots__ = ()
+    _slot_names = {}  # {field_name: slot_name}
+
+    def __getitem__(self, field_name):
+        try:
+            return getattr(self, self._slot_names[field_name])
+        except AttributeError:
+            raise KeyError(field_name) from None
+
+    def __setitem__(self, field_name, value):
+        setattr(self, self._slot_names[field_name], value)
+
+    def __delitem__(self, field_name):
+        try:
+            delattr(self, self._slot_names[field_name])
+        except AttributeError:
+            raise KeyError(field_name) from None
+
+    def __contains__(self, field_name):
+        slot_name = self._slot_names.get(field_name)
+        return slot_name is not None and hasattr(self, slot_name)
+
+    def __iter__(self):
+        for field_name, slot_name in self._slot_names.items():
+            if hasattr(self, slot_name):
+                yield field_name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def update(self, values=()):
+        if isinstance(values, Mapping):
+            values = values.items()
+        slot_names = self._slot_names
+        for field_name, value in values:
+            setattr(self, slot_names[field_name], value)
+
+    def copy(self):
+        state = self.__class__()
+        for slot_name in self.__slots__:
+            value = getattr(self, slot_name, _UNSET)
+            if value is not _UNSET:
+                setattr(state, slot_name, value)
+        return state
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, dict(self.items()))
+
+
+_UNSET = object()
+_UNMODIFIED = frozenset()  # _modified of resources without modified field.
+
+
+def _compact_state_class(resource):
+    """
+    Return a _CompactState sub-class with one slot per field of resource.
+    """
+    field_names = [field.name for field in resource._fields]
+    field_names.extend(name for name, attr in vars(resource).items()
+                       if isinstance(attr, Field) and name not in field_names)
+    slot_names = OrderedDict((field_name, '_{}'.format(position))
+                             for position, field_name in enumerate(field_names))
+    return type('{}State'.format(resource.__name__), (_CompactState,),
+                {'__slots__': tuple(slot_names.values()),
+                 '_slot_names': slot_names})
+
+
+def _compact_instance_class(resource):
+    """
+    Return a sub-class of compact resource without __dict__, its slots
+    store _state, _modified and the cache of each relation field.
+    """
+    slot_names = ['_state', '_modified']
+    slot_names.extend('_cache_{}'.format(name) for name, attr in vars(resource).items()
+                      if isinstance(attr, Field) and not isinstance(attr, ScalarField))
+    # type.__new__ doesn't register the sub-class like MetaResource.__init__.
+    return type.__new__(MetaResource, resource.__name__, (resource,),
+                        {'__slots__': tuple(slot_names),
+                         '__module__': resource.__module__,
+                         '__qualname__': resource.__qualname__})
+
+
+def _new_compact_instance(cls, **kwargs):
+    """
+    __new__ of compact resources.
+    """
+    return object.__new__(cls._instance_class)
 
 
 class Resource(metaclass=MetaResource):
 
+    __slots__ = ()  # sub-classes have a __dict__ unless Meta.compact is set in their body.
+    _state_factory = dict  # type of _state, see Meta.compact
+    _instance_class = None  # class of instances, see Meta.compact
+
     def __init__(self, **kwargs):
-        self._state = {}
+        self._state = self._state_factory()
+        self._modified = _UNMODIFIED  # names of fields set since the last save or update.
         expected_fields_name = set(field.name for field in self._fields)
         got_fields = set(kwargs)
         wrong_fields = got_fields - set(expected_fields_name)
@@ -414,6 +938,45 @@ class Resource(metaclass=MetaResource):
     def select(cls, *field):
         return Query(cls, field)
 
+    @classmethod
+    def filter(cls, criteria):
+        """
+        Return a Query on resources matching criteria, use its
+        update() and delete() methods to modify rows with one statement.
+        """
+        return Query(cls, ()).where(criteria)
+
+    @classmethod
+    def prefetch(cls, resources, *paths):
+        """
+        Load related resources of fields named by paths for all resources
+        with one query per field and return resources as a list.
+
+        See Query.prefetch for paths.
+        """
+        resources = list(resources)
+        for field, nested_paths in cls._related_fields(paths):
+            field.prefetch(resources, nested_paths)
+        return resources
+
+    @classmethod
+    def _related_fields(cls, paths):
+        """
+        Return [(related field, [nested path, ...]), ...] from paths.
+        """
+        related_fields = OrderedDict()
+        for path in paths:
+            field_name, _, nested_path = path.partition('__')
+            field = next((vars(klass)[field_name] for klass in cls.__mro__
+                          if field_name in vars(klass)), None)
+            if not hasattr(field, 'prefetch'):
+                raise ValueError("{} has no related field '{}'"
+                                 .format(cls.__name__, field_name))
+            nested_paths = related_fields.setdefault(field, [])
+            if nested_path:
+                nested_paths.append(nested_path)
+        return list(related_fields.items())
+
     def save(self):
         fields = []
         values = []
@@ -423,14 +986,61 @@ class Resource(metaclass=MetaResource):
 
         db = type(type(self)).db
         sql = db.sql_translator.save(self._table_name, fields)
-        cursor = db.execute(sql, values)
-        last_id = cursor.lastrowid  # FIXME push last_id to _state.
-        cursor.connection.commit()
+        with db.transaction():
+            last_id = db.execute(sql, values).lastrowid  # FIXME push last_id to _state.
         for field in self.Meta.primary_key:
             if field.name == 'id':
                self.id = last_id
+        self._modified = _UNMODIFIED
+
+    @classmethod
+    def bulk_create(cls, resources, batch_size=100):
+        """
+        Insert resources in one transaction with one INSERT statement per
+        batch of batch_size resources and return them as a list.
+
+        resources - iterable of instances of cls or of dicts of field values.
+
+        The id of resources is set when the database gives the auto
+        increment id of inserted rows.
+        """
+        if batch_size < 1:
+            raise ValueError('batch_size must be greater than 0')
+
+        resources = [resource if isinstance(resource, cls) else cls(**resource)
+                     for resource in resources]
+
+        db = type(cls).db
+        auto_id = any(field.name == 'id' for field in cls.Meta.primary_key)
+        with db.transaction():
+            # Rows of a statement have the same fields.
+            batches = OrderedDict()  # {field names: [resource, ...]}
+            for resource in resources:
+                batches.setdefault(tuple(resource._state), []).append(resource)
+
+            for field_names, batch in batches.items():
+                max_rows = db.sql_translator.max_parameters // max(len(field_names), 1)
+                nb_rows = max(1, min(batch_size, max_rows))
+                for start in range(0, len(batch), nb_rows):
+                    rows = batch[start:start + nb_rows]
+                    sql = db.sql_translator.save(cls._table_name, field_names, len(rows))
+                    values = [value for row in rows for value in row._state.values()]
+                    first_id = db.sql_translator.first_inserted_id(
+                        db.execute(sql, values).lastrowid, len(rows))
+                    if auto_id and first_id is not None and 'id' not in field_names:
+                        for row_id, row in enumerate(rows, first_id):
+                            row.id = row_id
+
+        for resource in resources:
+            resource._modified = _UNMODIFIED
+        return resources
 
     def update(self):
+        """
+        Update the resource and the resources of its Has fields
+        in one transaction. Only fields set since the resource has been
+        loaded or saved are written, nothing is sent if no field is set.
+        """
         fields = []
         values = []
         update_with_self = []
@@ -441,27 +1051,32 @@ class Resource(metaclass=MetaResource):
             in type(self)._fields
             if isinstance(field, Has))
 
-        for field, value in self._state.items():
-            if field in has_fields:
-                if isinstance(value, SetRef):
-                    value.save()
-                else:
-                    for id_field in type(self)._id_fields_names:
-                        value._state["{}_{}".format(self._table_name, id_field)] = getattr(self, id_field)
-                    update_with_self.append(value)
-            else:
-                fields.append(field)
-                values.append(value)
-
-        for field_name in self._id_fields_names:
-            values.append(self._state[field_name])
-
         db = type(type(self)).db
-        sql = db.sql_translator.update(self._table_name, fields, self._id_fields_names)
-        db.execute(sql, values).connection.commit()
+        with db.transaction():
+            for field, value in self._state.items():
+                if field in has_fields:
+                    if isinstance(value, SetRef):
+                        value.save()
+                    else:
+                        for id_field in type(self)._id_fields_names:
+                            setattr(value, "{}_{}".format(self._table_name, id_field),
+                                    getattr(self, id_field))
+                        update_with_self.append(value)
+                elif field in self._modified and field not in self._id_fields_names:
+                    fields.append(field)
+                    values.append(value)
+
+            if fields:
+                for field_name in self._id_fields_names:
+                    values.append(self._state[field_name])
+
+                sql = db.sql_translator.update(self._table_name, fields, self._id_fields_names)
+                db.execute(sql, values)
+
+            for resource in update_with_self:
+                resource.update()
 
-        for resource in update_with_self:
-            resource.update()
+        self._modified = _UNMODIFIED
 
     def delete(self):
         values = []
@@ -470,89 +1085,357 @@ class Resource(metaclass=MetaResource):
 
         db = type(type(self)).db
         sql = db.sql_translator.delete(self._table_name, self._id_fields_names)
-        db.execute(sql, values).connection.commit()
+        with db.transaction():
+            db.execute(sql, values)
 
-    def to_dict(self):
+    def to_dict(self, field_names=None):
+        """
+        Return resource as dict, if field_names is given
+        only these fields are in the dict.
+        """
         dictionary = {}
         for field in self._fields:
+            if field_names is not None and field.name not in field_names:
+                continue
             value = getattr(self, field.name)
             if value is not NotSelectedField:
-                if isinstance(value, Query):
+                if isinstance(value, (Query, list)):
                     value = [e.to_dict() for e in value]
                 dictionary[field.name] = value
         return dictionary
 
 
-class Condition(object):
+class Condition(ABC):
+    """
+    Immutable node of a SQL expression tree built by comparing fields
+    of resource classes, for example:
+
+        (Room.hotel_id == 1) & (Room.bed_count > 2)
+
+    Values become placeholders, the SQL text is compiled once per shape
+    of tree (key attribute) and params gives values in placeholder order.
+    """
+
+    __slots__ = ('_key',)
     substitution = '?'
 
-    def __init__(self, sql):
-        self.sql = [sql]
-        self.user_input = []
+    def __init__(self):
+        self._key = None
+
+    @property
+    def key(self):
+        """
+        Hashable shape of the tree, trees differing only by their values
+        have the same key.
+        """
+        if self._key is None:
+            self._key = self._make_key()
+        return self._key
+
+    @property
+    def sql(self):
+        if MetaResource.db is None:
+            sql_translator = SQLTranslator
+        else:
+            sql_translator = MetaResource.db.sql_translator
+        return _compile(self.key, sql_translator, Condition.substitution)
+
+    @property
+    def params(self):
+        params = []
+        self._collect_params(params)
+        return tuple(params)
+
+    @abstractmethod
+    def _make_key(self):
+        pass
+
+    def _collect_params(self, params):
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def compile_key(key, sql_translator, substitution):
+        """
+        Return SQL of the node having key.
+        """
 
     def __or__(self, other):
-        if isinstance(other, Condition):
-            self.sql.insert(0, '(')
-            self.sql.append("OR")
-            self.sql.extend(other.sql)
-            self.sql.append(")")
-            self.user_input.extend(other.user_input)
-            return self
+        return or_(self, other)
 
     def __and__(self, other):
-        if isinstance(other, Condition):
-            self.sql.insert(0, '(')
-            self.sql.append("AND")
-            self.sql.extend(other.sql)
-            self.sql.append(")")
-            self.user_input.extend(other.user_input)
-            return self
-
-    def _update(self, other):
-        if isinstance(other, Condition):
-            self.sql.extend(other.sql)
-            self.user_input.extend(other.user_input)
-        else:
-            self.sql.append(self.substitution)
-            self.user_input.append(other)
+        return and_(self, other)
 
     def __eq__(self, other):
-        self.sql.append("=")
-        self._update(other)
-        return self
+        return Comparison('=', self, other)
 
     def __ne__(self, other):
-        self.sql.append("!=")
-        self._update(other)
-        return self
+        return Comparison('!=', self, other)
 
     def __gt__(self, other):
-        self.sql.append(">")
-        self._update(other)
-        return self
+        return Comparison('>', self, other)
 
     def __lt__(self, other):
-        self.sql.append("<")
-        self._update(other)
-        return self
+        return Comparison('<', self, other)
 
     def __le__(self, other):
-        self.sql.append("<=")
-        self._update(other)
-        return self
+        return Comparison('<=', self, other)
 
     def __ge__(self, other):
-        self.sql.append(">=")
-        self._update(other)
-        return self
+        return Comparison('>=', self, other)
+
+    def in_(self, values):
+        return In(self, values)
+
+    def between(self, low, high):
+        return Between(self, low, high)
+
+    def like(self, pattern):
+        """
+        % matches any sequence of characters and _ any character,
+        a backslash escapes them.
+        """
+        return Like(self, pattern)
+
+    def is_null(self, is_null=True):
+        """
+        Return condition true when the value is NULL or, if is_null
+        is False, when the value isn't NULL.
+        """
+        return IsNull(self, not is_null)
+
+    # == builds a Comparison, nodes are hashed by identity.
+    __hash__ = object.__hash__
 
     def __repr__(self):
-        return 'Condition({})'.format(" ".join(self.sql))
+        return '{}({})'.format(type(self).__name__, self.sql)
+
+
+class Column(Condition):
+    """
+    Column of a table.
+    """
+
+    __slots__ = ('name',)
+
+    def __init__(self, table_name, field_name):
+        super().__init__()
+        self.name = '{}.{}'.format(table_name, field_name)
+
+    def _make_key(self):
+        return (Column, self.name)
+
+    @staticmethod
+    def compile_key(key, sql_translator, substitution):
+        return key[1]
+
+
+class Value(Condition):
+    """
+    Value given to the database as parameter.
+    """
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+    def _make_key(self):
+        return (Value,)
+
+    def _collect_params(self, params):
+        params.append(self.value)
+
+    @staticmethod
+    def compile_key(key, sql_translator, substitution):
+        return substitution
+
+
+def _operand(value):
+    if isinstance(value, Condition):
+        return value
+    return Value(value)
+
+
+class Comparison(Condition):
+
+    __slots__ = ('operator', 'left', 'right')
+
+    def __init__(self, operator, left, right):
+        super().__init__()
+        self.operator = operator
+        self.left = _operand(left)
+        self.right = _operand(right)
+
+    def _make_key(self):
+        return (Comparison, self.operator, self.left.key, self.right.key)
+
+    def _collect_params(self, params):
+        self.left._collect_params(params)
+        self.right._collect_params(params)
+
+    @staticmethod
+    def compile_key(key, sql_translator, substitution):
+        return '{} {} {}'.format(_compile(key[2], sql_translator, substitution), key[1],
+                                 _compile(key[3], sql_translator, substitution))
+
+
+class BoolOp(Condition):
+    """
+    AND or OR of conditions, nested operations of the same
+    operator are flattened.
+    """
+
+    __slots__ = ('operator', 'operands')
+
+    def __init__(self, operator, operands):
+        super().__init__()
+        self.operator = operator
+        self.operands = []
+        for operand in operands:
+            if isinstance(operand, BoolOp) and operand.operator == operator:
+                self.operands.extend(operand.operands)
+            else:
+                self.operands.append(_operand(operand))
+        self.operands = tuple(self.operands)
+
+    def _make_key(self):
+        return (BoolOp, self.operator) + tuple(operand.key for operand in self.operands)
+
+    def _collect_params(self, params):
+        for operand in self.operands:
+            operand._collect_params(params)
+
+    @staticmethod
+    def compile_key(key, sql_translator, substitution):
+        return '({})'.format(' {} '.format(key[1]).join(
+            _compile(operand, sql_translator, substitution) for operand in key[2:]))
+
+
+class In(Condition):
+
+    __slots__ = ('operand', 'values')
+
+    def __init__(self, operand, values):
+        super().__init__()
+        self.operand = _operand(operand)
+        self.values = tuple(values)
+
+    def _make_key(self):
+        return (In, self.operand.key, len(self.values))
+
+    def _collect_params(self, params):
+        self.operand._collect_params(params)
+        params.extend(self.values)
+
+    @staticmethod
+    def compile_key(key, sql_translator, substitution):
+        return sql_translator.in_(_compile(key[1], sql_translator, substitution),
+                                  key[2], substitution)
+
+
+class Between(Condition):
+
+    __slots__ = ('operand', 'low', 'high')
+
+    def __init__(self, operand, low, high):
+        super().__init__()
+        self.operand = _operand(operand)
+        self.low = low
+        self.high = high
+
+    def _make_key(self):
+        return (Between, self.operand.key)
+
+    def _collect_params(self, params):
+        self.operand._collect_params(params)
+        params.append(self.low)
+        params.append(self.high)
+
+    @staticmethod
+    def compile_key(key, sql_translator, substitution):
+        return sql_translator.between(_compile(key[1], sql_translator, substitution),
+                                      substitution)
+
+
+class Like(Condition):
+
+    __slots__ = ('operand', 'pattern')
+
+    def __init__(self, operand, pattern):
+        super().__init__()
+        self.operand = _operand(operand)
+        self.pattern = pattern
+
+    def _make_key(self):
+        return (Like, self.operand.key)
+
+    def _collect_params(self, params):
+        self.operand._collect_params(params)
+        params.append(self.pattern)
+
+    @staticmethod
+    def compile_key(key, sql_translator, substitution):
+        return sql_translator.like(_compile(key[1], sql_translator, substitution),
+                                   substitution)
+
+
+class IsNull(Condition):
+
+    __slots__ = ('operand', 'negated')
+
+    def __init__(self, operand, negated=False):
+        super().__init__()
+        self.operand = _operand(operand)
+        self.negated = negated
+
+    def _make_key(self):
+        return (IsNull, self.operand.key, self.negated)
+
+    def _collect_params(self, params):
+        self.operand._collect_params(params)
+
+    @staticmethod
+    def compile_key(key, sql_translator, substitution):
+        return sql_translator.is_null(_compile(key[1], sql_translator, substitution),
+                                      key[2])
+
+
+def and_(*conditions):
+    """
+    Return condition true when all conditions are true.
+    """
+    if not conditions:
+        raise ValueError('and_() expects at least one condition')
+    if len(conditions) == 1:
+        return _operand(conditions[0])
+    return BoolOp('AND', conditions)
+
+
+def or_(*conditions):
+    """
+    Return condition true when one of conditions is true.
+    """
+    if not conditions:
+        raise ValueError('or_() expects at least one condition')
+    if len(conditions) == 1:
+        return _operand(conditions[0])
+    return BoolOp('OR', conditions)
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _compile(key, sql_translator, substitution):
+    """
+    Return SQL of the condition having key.
+    """
+    return key[0].compile_key(key, sql_translator, substitution)
 
 
 class Field:
 
     to_py_factory = None
+    py_type = None  # type of values returned by to_py_factory
 
     def __init__(self, writable=True, readable=True, unique=False, nullable=False, primary_key=False, weak_id=False):
         self.unique = unique
@@ -564,17 +1447,21 @@ class Field:
 
     def __get__(self, obj, cls=None):
         if obj is None:
-            return Condition(
-                '{}.{}'.format(cls._table_name, self.name))
+            return Column(cls._table_name, self.name)
 
         value = obj._state[self.name]
         if value is NotSelectedField:
             return value
-        if value is None:
+        if value is None or value.__class__ is self.py_type:
             return value
         return self.to_py_factory(value)
 
     def __set__(self, obj, value):
+        # Setting the loaded value again doesn't modify the field.
+        if self.name not in obj._state or obj._state[self.name] != value:
+            if obj._modified is _UNMODIFIED:
+                obj._modified = set()
+            obj._modified.add(self.name)
         obj._state[self.name] = value
 
 
@@ -584,25 +1471,36 @@ class ScalarField(Field):
 
 class FloatField(ScalarField):
     to_py_factory = float
+    py_type = float
 
 
 class BinaryField(ScalarField):
     to_py_factory = bytes
+    py_type = bytes
 
 
 class DateField(ScalarField):
+    py_type = datetime.date
+
     @staticmethod
     def to_py_factory(value):
-        return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+        if value.__class__ is datetime.date:
+            return value
+        return datetime.date.fromisoformat(value)
 
 
 class DateTimeField(ScalarField):
+    py_type = datetime.datetime
+
     @staticmethod
     def to_py_factory(value):
-        return datetime.datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+        if value.__class__ is datetime.datetime:
+            return value
+        return datetime.datetime.fromisoformat(value)
 
 
 class NumericField(ScalarField):
+    py_type = Decimal
 
     def __init__(self, writable=True, readable=True, unique=False, nullable=False, primary_key=False, weak_id=False, precision=10, scale=3):
         """
@@ -621,6 +1519,7 @@ class NumericField(ScalarField):
 class IntegerField(ScalarField):
 
     to_py_factory = int
+    py_type = int
 
     def __init__(self, writable=True, readable=True, unique=False, nullable=False, primary_key=False, weak_id=False,
                  min_value=-2147483648, max_value=2147483647, auto_increment=False):
@@ -643,6 +1542,7 @@ class IntegerField(ScalarField):
 class StringField(ScalarField):
 
     to_py_factory = str
+    py_type = str
 
     def __init__(self, writable=True, readable=True, unique=False, nullable=False, primary_key=False, weak_id=False,
                  length=255, fixe_length=False):
@@ -651,12 +1551,62 @@ class StringField(ScalarField):
         self.fixe_length = int(fixe_length)
 
 
+def _select_related(instances, key_names, resource, ref_names, paths=(), fields=()):
+    """
+    Select rows of resource whose values of ref_names are the values of
+    key_names of one of instances with one query.
+
+    Return {values of key_names: [resource instance, ...]} with an item
+    for each instance having all key_names selected.
+
+    paths - paths of related fields prefetched on selected resources.
+    fields - names of selected fields, all fields are selected by default.
+    """
+    related = OrderedDict()
+    for instance in instances:
+        key = tuple(instance._state[name] for name in key_names)
+        if all(value is not NotSelectedField for value in key):
+            related[key] = []
+
+    if not related:
+        return related
+
+    for clause_where in _keys_criteria(resource, ref_names, list(related)):
+        query = resource.select(*fields).where(clause_where).prefetch(*paths)
+        for other_instance in query:
+            related[tuple(other_instance._state[name] for name in ref_names)].append(other_instance)
+    return related
+
+
+def _keys_criteria(resource, ref_names, keys):
+    """
+    Return criteria selecting rows of resource whose values of ref_names
+    are one of keys.
+
+    A single column uses in_() which is split by Query. Keys of several
+    columns are split in several criteria in order not to exceed
+    max_parameters of the database.
+    """
+    if len(ref_names) == 1:
+        return [getattr(resource, ref_names[0]).in_(key[0] for key in keys)]
+
+    max_keys = max(1, type(resource).db.sql_translator.max_parameters // len(ref_names))
+    return [or_(*(and_(*(getattr(resource, ref_name) == value
+                         for ref_name, value in zip(ref_names, key)))
+                  for key in keys[start:start + max_keys]))
+            for start in range(0, len(keys), max_keys)]
+
+
 class ToAssociationField(Field):
 
     def __init__(self, association):
         self.association = association
 
     def __get__(self, obj, cls=None):
+        prefetched = getattr(obj, '_cache_{}'.format(self.name), None)
+        if prefetched is not None:
+            return prefetched
+
         query = self.association.select()
 
         field_name = obj._id_fields_names[0]
@@ -675,6 +1625,25 @@ class ToAssociationField(Field):
 
         return query.join(obj, on=join_criteria).where(where_criteria)
 
+    def prefetch(self, instances, paths=()):
+        """
+        Select associations of all instances with one query and store them
+        in instances. Then, the field of each instance returns a list.
+        """
+        if not instances:
+            return
+
+        id_names = instances[0]._id_fields_names
+        associations = _select_related(
+            instances, id_names, self.association,
+            [instances[0]._table_name + '_' + name for name in id_names],
+            paths)
+
+        for instance in instances:
+            key = tuple(instance._state[name] for name in id_names)
+            if key in associations:
+                setattr(instance, '_cache_{}'.format(self.name), associations[key])
+
 
 class FromAssociationField(Field):
 
@@ -682,6 +1651,10 @@ class FromAssociationField(Field):
         self.resource = resource
 
     def __get__(self, association, cls=None):
+        prefetched = getattr(association, '_cache_{}'.format(self.name), None)
+        if prefetched is not None:
+            return prefetched
+
         field_name = self.resource._id_fields_names[0]
         association_field_value = getattr(
             association, self.resource._table_name + '_' + field_name)
@@ -696,6 +1669,22 @@ class FromAssociationField(Field):
 
         return self.resource.select().where(where_criteria)
 
+    def prefetch(self, associations, paths=()):
+        """
+        Select resources referenced by all associations with one query and
+        store them in associations. Then, the field of each association
+        returns a list.
+        """
+        id_names = self.resource._id_fields_names
+        ref_names = [self.resource._table_name + '_' + name for name in id_names]
+        resources = _select_related(associations, ref_names,
+                                    self.resource, id_names, paths)
+
+        for association in associations:
+            key = tuple(association._state[name] for name in ref_names)
+            if key in resources:
+                setattr(association, '_cache_{}'.format(self.name), resources[key])
+
 
 class ComposedBy(Field):
     def __init__(self, other_resource, cardinality='0..*', related_name=None, writable=True, readable=True):
@@ -725,6 +1714,10 @@ class ComposedBy(Field):
             self.related_name = to_underscore(other_resource) + '_ref'
 
     def __get__(self, obj, cls=None):
+        prefetched = getattr(obj, '_cache_{}'.format(self.name), None)
+        if prefetched is not None:
+            return prefetched
+
         other_resource = MetaResource.register[self.other_resource][0]
         query = other_resource.select()
 
@@ -745,6 +1738,28 @@ class ComposedBy(Field):
         query.where(clause_where)
         return query
 
+    def prefetch(self, instances, paths=()):
+        """
+        Select components of all instances with one query and store them
+        in instances. Then, the field of each instance returns a list.
+
+        paths - paths of related fields prefetched on components.
+        """
+        if not instances:
+            return
+
+        id_names = instances[0]._id_fields_names
+        components = _select_related(
+            instances, id_names,
+            MetaResource.register[self.other_resource][0],
+            [instances[0]._table_name + '_' + name for name in id_names],
+            paths)
+
+        for instance in instances:
+            key = tuple(instance._state[name] for name in id_names)
+            if key in components:
+                setattr(instance, '_cache_{}'.format(self.name), components[key])
+
     def __set__(self, obj, value):
         raise AttributeError("can't set attribute {}".format(self.name))
 
@@ -792,6 +1807,7 @@ class SetRef:
                 for field_name in fields_to_update:
                     setattr(resource, field_name, None)
                 resource.update()
+        self._resource_to_update.clear()
 
     def __iter__(self):
         return iter(self.references)
@@ -872,6 +1888,48 @@ class Has(Field):
 
         return getattr(obj, '_cache_{}'.format(self.name))
 
+    def prefetch(self, instances, paths=()):
+        """
+        Select references of all instances with one query and store them
+        in the cache of instances.
+
+        References are ids of the other resources, paths through this
+        field can't be prefetched and raise ValueError.
+        """
+        if paths:
+            raise ValueError("related fields of '{}' can't be prefetched, "
+                             "it gives ids only".format(self.name))
+
+        if not instances:
+            return
+
+        other_resource = MetaResource.register[self.other_resource][0]
+        id_names = instances[0]._id_fields_names
+        ref_names = [instances[0]._table_name + '_' + name for name in id_names]
+        related = _select_related(
+            instances, id_names, other_resource, ref_names,
+            fields=list(other_resource._id_fields_names) + ref_names)
+
+        for instance in instances:
+            key = tuple(instance._state[name] for name in id_names)
+            if key not in related:
+                continue
+
+            references = [{field_name: getattr(other_instance, field_name)
+                           for field_name
+                           in other_resource._id_fields_names}
+                          for other_instance
+                          in related[key]]
+
+            if self.card_max == '*':
+                setattr(instance,
+                        '_cache_{}'.format(self.name),
+                        SetRef(instance, self.name, other_resource, references))
+            elif references:
+                setattr(instance, '_cache_{}'.format(self.name), references[0])
+            else:
+                setattr(instance, '_cache_{}'.format(self.name), None)
+
     def __set__(self, obj, value):
         other_resource = MetaResource.register[self.other_resource][0]
         if isinstance(value, other_resource):
@@ -2,6 +2,7 @@
 #-*- coding:utf-8 -*-
 
 from ..db import DataBase
+from .server import JSON_ENCODERS
 import os
 import json
 
@@ -96,6 +97,11 @@ class StrValidator(IsTypeValidator):
     name_type = 'string'
 
 
+class BoolValidator(IsTypeValidator):
+    expected_type = bool
+    name_type = 'boolean'
+
+
 class DictValidator(IsTypeValidator):
     expected_type = dict
     name_type = 'object'
@@ -142,7 +148,7 @@ class TranstypingValidator:
                     'must be a dict of parameters to {}'.format(self.constructor))
             try:
                 return self.constructor(**item)
-            except TypeError as error:
+            except (TypeError, ValueError) as error:
                 msg = '{} {}'.format(self.constructor, str(error))
                 raise ConfigIsNotValidError(msg)
         return self.constructor(item)
@@ -184,7 +190,14 @@ class ConfigReader:
 
 
 ConfigReader.VALIDATOR = DictValidator(children={
-    "database": TranstypingValidator(DataBase)
+    "database": TranstypingValidator(DataBase),
+    # Parameters of RESTServer
+    "server": DictValidator(is_required=False, children={
+        "optimize": BoolValidator(is_required=False),
+        "stream_batch_size": IntValidator(int_min=1, is_required=False),
+        "transaction_per_request": BoolValidator(is_required=False),
+        "json_encoder": ChoiceValidator(tuple(JSON_ENCODERS), is_required=False)
+    })
 })
 
 
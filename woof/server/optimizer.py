@@ -1,170 +1,436 @@
-import opcode
+"""
+Replace controllers generated by EntryPoint.crud with controllers whose
+source is generated for the resource: SQL statements are built once and
+rows are converted to dicts without creating Resource instances.
+
+Components of ComposedBy fields are selected with one query per field
+for all resources of a batch and are appended to the list of their
+composite, such as Query.prefetch does.
+
+A generated controller calls the original one for requests it isn't
+specialized for (query string parameters, partial bodies, ...).
+"""
+
 import textwrap
-from types import CodeType, FunctionType
-
-from ..resource import MetaResource, Query, ScalarField
-from ..db import DataBase
-
-
-def build_get_single_ctrl(query, args_names, field_names):
-    """
-    Create optimized controller.
-    """
-
-    codes = [
-        opcode.opmap['LOAD_GLOBAL'], 0, 0,
-        opcode.opmap['LOAD_CONST'], 1, 0
-    ]
-
-    for i in range(len(args_names)):
-        codes.extend((opcode.opmap['LOAD_FAST'], i, 0))
-
-    codes.extend((
-        opcode.opmap['BUILD_TUPLE'], len(args_names), 0,
-        opcode.opmap['CALL_FUNCTION'], 2, 0,
-        opcode.opmap['LOAD_ATTR'], 1, 0,
-        opcode.opmap['CALL_FUNCTION'], 0, 0,
-        opcode.opmap['STORE_FAST'], len(args_names), 0,  # store to 'values'
-
-        opcode.opmap['LOAD_FAST'], len(args_names), 0,  # load from 'values'
-        opcode.opmap['LOAD_CONST'], 0, 0,
-        opcode.opmap['COMPARE_OP'], 8, 0,
-        opcode.opmap['POP_JUMP_IF_FALSE'], len(args_names) * 3 + 37, 0,
-
-        opcode.opmap['LOAD_FAST'], len(args_names), 0,
-        opcode.opmap['RETURN_VALUE'],
-
-        opcode.opmap['LOAD_GLOBAL'], 2, 0, # (dict)
-        opcode.opmap['LOAD_GLOBAL'], 3, 0, # (zip)
-        opcode.opmap['LOAD_CONST'], 2, 0,
-        opcode.opmap['LOAD_FAST'], len(args_names), 0, # load from 'values'
-        opcode.opmap['CALL_FUNCTION'], 2, 0,
-        opcode.opmap['CALL_FUNCTION'], 1, 0,
-        opcode.opmap['RETURN_VALUE'],
-    ))
-
-    ctrl = FunctionType(
-        CodeType(
-            len(args_names),  #  argcount
-            0,  #  kwonlyargcount
-            len(args_names) + 1,  # + nb var used
-            7,  # stacksize
-            67,  # flags
-            bytes(codes),  # codestring
-            (None, query, field_names),  # constants
-            ('sql_execute', 'fetchone', 'dict', 'zip'),  # names
-            tuple(args_names) + ('values',),  # varnames + var used
-            __file__,  # filename
-            'ctrl',  # name
-            0,  # firstlineno
-            b'\x00\x01\x1b\x01\x0c\x01\x04\x01'  # lnotab
-        ), {'dict': dict, 'zip': zip, 'sql_execute': MetaResource.db.execute}
-    )
+
+from ..errors import NotFoundError
+from ..resource import ComposedBy, MetaResource, ScalarField, and_, _keys_criteria, _row_decoder
+
+
+def _compile_functions(src, namespace, *names):
+    """
+    Compile src defining functions called names and return these functions.
+    namespace gives the global names used by src.
+    """
+    namespace = dict(namespace)
+    exec(compile(textwrap.dedent(src), __file__, 'exec'), namespace)
+    return tuple(namespace[name] for name in names)
+
+
+def _compile_controller(src, namespace):
+    """
+    Compile src defining a function called ctrl and return this function.
+    """
+    return _compile_functions(src, namespace, 'ctrl')[0]
+
+
+def _scalar_fields(resource):
+    return [field for field in resource._fields if isinstance(field, ScalarField)]
+
+
+def _where_ids(resource, field_names):
+    """
+    Return criteria comparing field_names to parameters or None if
+    field_names is empty.
+    """
+    if not field_names:
+        return None
+    return and_(*(getattr(resource, name) == None for name in field_names))
+
+
+def _has_arguments(args_names, names):
+    """
+    Return True if the url gives all parameters used by the controller.
+
+    Generated sources name their variables with a leading underscore,
+    urls having parameters named like that aren't optimized.
+    """
+    return (set(names).issubset(args_names)
+            and not any(name.startswith('_') for name in args_names))
+
+
+def _arguments(first=()):
+    """
+    Return arguments of the generated controller signature, parameters
+    of the url are in the _url dict.
+    """
+    return ', '.join(list(first) + ['**_url'])
+
+
+def _url_parameter(name):
+    return '_url[{!r}]'.format(name)
+
+
+def _parameters(values):
+    return '({})'.format(''.join('{}, '.format(value) for value in values))
+
+
+def _dict_source(resource, value_source, convert=True):
+    """
+    Return source of a dict literal equal to Resource.to_dict(), scalar
+    values are converted by to_py_factory and components are empty lists.
+
+    value_source - function returning source of the value of a scalar field.
+    convert - False if values are already converted by a row decoder.
+    """
+    items = []
+    for position, field in enumerate(resource._fields):
+        if not isinstance(field, ScalarField):
+            items.append('{!r}: []'.format(field.name))
+        elif convert:
+            items.append('{!r}: None if {value} is None else _convert_{}({value})'
+                         .format(field.name, position, value=value_source(field.name)))
+        else:
+            items.append('{!r}: {}'.format(field.name, value_source(field.name)))
+    return '{' + ', '.join(items) + '}'
+
+
+def _row_source(field_names):
+    """
+    Return function returning source of the value of a field in a row.
+    """
+    def value_source(name):
+        return '_row[{}]'.format(field_names.index(name))
+    return value_source
+
+
+def _converters(resource):
+    return {'_convert_{}'.format(position): field.to_py_factory
+            for position, field in enumerate(resource._fields)
+            if isinstance(field, ScalarField)}
+
+
+def _key_source(values):
+    return '({})'.format(''.join('{}, '.format(value) for value in values))
+
+
+class _Component:
+    """
+    Load dicts of the components of a ComposedBy field.
+    """
+
+    def __init__(self, field, composite):
+        self.name = field.name
+        self.resource = MetaResource.register[field.other_resource][0]
+        self.ref_names = [composite._table_name + '_' + name
+                          for name in composite._id_fields_names]
+
+        self.batch_size = self.resource.select().batch_size
+        _, _, field_names = self.resource.select().get_sql()
+        value_source = _row_source(field_names)
+        src = """
+        def to_dict(_row):
+            return {dict}
+
+        def keys(_row):
+            return {ref_key}, {id_key}
+        """.format(dict=_dict_source(self.resource, value_source, convert=False),
+                   ref_key=_key_source(map(value_source, self.ref_names)),
+                   id_key=_key_source(map(value_source, self.resource._id_fields_names)))
+
+        self.decode_row = _row_decoder(self.resource, tuple(field_names))
+        self.to_dict, self.keys = _compile_functions(src, {}, 'to_dict', 'keys')
+        self.components = _components(self.resource)
+
+    def load(self, composites):
+        """
+        Append dicts of components to the list of their composite.
+
+        composites - {id values read from database: dict of composite}
+        """
+        if not composites:
+            return
+
+        components = {}
+        for criteria in _keys_criteria(self.resource, self.ref_names, list(composites)):
+            cursor, _ = self.resource.select().where(criteria).execute()
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                for row in map(self.decode_row, rows):
+                    ref_key, id_key = self.keys(row)
+                    component = self.to_dict(row)
+                    composites[ref_key][self.name].append(component)
+                    components[id_key] = component
+
+        if components:
+            _load(self.components, components)
+
+
+def _components(resource):
+    return [_Component(field, resource)
+            for field in resource._fields
+            if isinstance(field, ComposedBy)]
+
+
+def _load(components, composites):
+    """
+    Load components of composites.
+
+    composites - {id values read from database: dict of composite}
+    """
+    for component in components:
+        component.load(composites)
+
+
+def build_get_single_ctrl(builder, args_names):
+    """
+    Create optimized controller for get single resource request.
+    """
+    resource = builder.resource
+    if not _has_arguments(args_names, resource._id_fields_names):
+        return None
+
+    sql, _, field_names = (resource.select()
+                           .where(_where_ids(resource, resource._id_fields_names))
+                           .get_sql())
+    components = _components(resource)
+    value_source = _row_source(field_names)
+
+    src = """
+    def ctrl({arguments}):
+        if _query_string:
+            return _fallback(_query_string, **_url)
+        _row = _execute(_SQL, {parameters}).fetchone()
+        if _row is None:
+            return None
+        _row = _decode_row(_row)
+        _dict = {dict}
+        {load}
+        return _dict
+    """.format(arguments=_arguments(['_query_string=None']),
+               parameters=_parameters(map(_url_parameter, resource._id_fields_names)),
+               dict=_dict_source(resource, value_source, convert=False),
+               load='_load(_COMPONENTS, {{{}: _dict}})'.format(
+                   _key_source(map(value_source, resource._id_fields_names)))
+               if components else '')
+
+    namespace = {'_fallback': builder, '_execute': MetaResource.db.execute, '_SQL': sql,
+                 '_decode_row': _row_decoder(resource, tuple(field_names)),
+                 '_load': _load, '_COMPONENTS': components}
+    ctrl = _compile_controller(src, namespace)
     ctrl.single = True
-    ctrl.optimizable = True
+    ctrl.query_string = True
     return ctrl
 
 
-def build_get_ctrl(query, args_names, field_names):
+def build_get_ctrl(builder, args_names):
     """
-    Create optimized controller for get request.
+    Create optimized controller for get resources request.
     """
+    resource = builder.resource
+    if not _has_arguments(args_names, builder.inherited_ids):
+        return None
+
+    query = resource.select()
+    sql, _, field_names = query.where(_where_ids(resource, builder.inherited_ids)).get_sql()
+    components = _components(resource)
+    value_source = _row_source(field_names)
 
     src = """
-    def ctrl({args}):
-        cursor = sql_execute({query!r}, ({query_params}))
-        return [dict(zip({field_names!r}, record))
-                for record
-                in cursor]
-    """.format(
-        args=', '.join(args_names),
-        query_params=', '.join(args_names) + (', ' if len(args_names) == 1 else ''),
-        query=query,
-        field_names=field_names)
-
-    locals_env = {'dict': dict,
-                  'zip': zip,
-                  'sql_execute': MetaResource.db.execute}
-
-    exec(compile(textwrap.dedent(src), __file__, 'single'), locals_env)
-
-    ctrl = locals_env['ctrl']
-    ctrl.optimizable = True
+    def ctrl({arguments}):
+        if _query_string:
+            return _fallback(_query_string, **_url)
+        return _dicts(_execute(_SQL, {parameters}))
+    """
+    if components:
+        src += """
+    def _dicts(_cursor):
+        while True:
+            _rows = _cursor.fetchmany(_BATCH_SIZE)
+            if not _rows:
+                return
+            _composites = {{}}
+            for _row in map(_decode_row, _rows):
+                _composites[{key}] = {dict}
+            _load(_COMPONENTS, _composites)
+            yield from _composites.values()
+    """
+    else:
+        src += """
+    def _dicts(_cursor):
+        while True:
+            _rows = _cursor.fetchmany(_BATCH_SIZE)
+            if not _rows:
+                return
+            for _row in map(_decode_row, _rows):
+                yield {dict}
+    """
+
+    src = src.format(arguments=_arguments(['_query_string=None']),
+                     parameters=_parameters(map(_url_parameter, builder.inherited_ids)),
+                     key=_key_source(map(value_source, resource._id_fields_names)),
+                     dict=_dict_source(resource, value_source, convert=False))
+
+    namespace = {'_fallback': builder, '_execute': MetaResource.db.execute, '_SQL': sql,
+                 '_decode_row': _row_decoder(resource, tuple(field_names)),
+                 '_BATCH_SIZE': query.batch_size, '_load': _load, '_COMPONENTS': components}
+    ctrl = _compile_controller(src, namespace)
+    ctrl.query_string = True
     return ctrl
 
 
-class Analyser:
-    """
-    Analyse controller to extract sql query performed and parameter used.
-    """
-
-    def __init__(self, controller, url_parameters_names):
-        self.controller = controller
-        self._backup_mtd = None
-        self.query = None
-        self.ctrl_arguments = None
-        self.selected_fields = None
-        self.kwargs_names = {name: name
-                             for name
-                             in url_parameters_names}
-
-    def run(self):
-        self._backup_mtd = DataBase.execute
-        DataBase.execute = self._database_execute
-        try:
-            self.controller(**self.kwargs_names)
-        except AttributeError: # 'NoneType' object has no attribute 'fetchone'
-            pass
-        DataBase.execute = self._backup_mtd
-
-        self._backup_mtd = Query.__init__
-        Query.__init__ = self._query_init
-        try:
-            self.controller(**self.kwargs_names)
-        except AttributeError: # 'NoneType' object has no attribute 'fetchone'
-            pass
-        Query.__init__ = self._backup_mtd
-
-    def _database_execute(self, sql_query, parameters):
-        self.query = sql_query
-        self.ctrl_arguments = parameters
-
-    def _query_init(self, resource, fields):
-        if fields:
-            self.selected_fields = fields
-        else:
-            self.selected_fields = tuple(field.name for field
-                                         in resource._fields
-                                         if isinstance(field, ScalarField))
+def build_post_ctrl(builder, args_names):
+    """
+    Create optimized controller for post resource request.
+
+    Only a body giving all scalar fields, except the auto increment id,
+    is inserted by the optimized controller.
+    """
+    resource = builder.resource
+    if not _has_arguments(args_names, builder.inherited_ids):
+        return None
+
+    fields = _scalar_fields(resource)
+    auto_id = any(field.name == 'id' for field in resource.Meta.primary_key)
+    inserted = [field.name for field in fields if not (auto_id and field.name == 'id')]
+    components = _components(resource)
+    db = MetaResource.db
+
+    def value_source(name):
+        if auto_id and name == 'id':
+            return '_last_id'
+        return '_body[{!r}]'.format(name)
+
+    src = """
+    def ctrl({arguments}):
+        if _body.__class__ is not dict:
+            return _fallback(_body, **_url)
+        {inherited_ids}
+        if _body.keys() != _INSERTED:
+            return _fallback(_body, **_url)
+        with _transaction():
+            _last_id = _execute(_SQL, {parameters}).lastrowid
+            _dict = {dict}
+            {load}
+        return _dict
+    """.format(arguments=_arguments(['_body']),
+               inherited_ids='\n        '.join("_body[{!r}] = {}".format(name, _url_parameter(name))
+                                                for name in builder.inherited_ids),
+               parameters=_parameters('_body[{!r}]'.format(name) for name in inserted),
+               dict=_dict_source(resource, value_source),
+               load='_load(_COMPONENTS, {{{}: _dict}})'.format(
+                   _key_source('_dict[{!r}]'.format(name) for name in resource._id_fields_names))
+               if components else '')
+
+    namespace = _converters(resource)
+    namespace.update(_fallback=builder, _execute=db.execute, _transaction=db.transaction,
+                     _SQL=db.sql_translator.save(resource._table_name, inserted),
+                     _INSERTED=frozenset(inserted), _load=_load, _COMPONENTS=components)
+    return _compile_controller(src, namespace)
+
+
+def build_put_ctrl(builder, args_names):
+    """
+    Create optimized controller for put resource request.
+
+    Only a body giving all scalar fields is updated by the optimized controller.
+    """
+    resource = builder.resource
+    if not _has_arguments(args_names, builder.inherited_ids):
+        return None
+
+    fields = _scalar_fields(resource)
+    id_names = resource._id_fields_names
+    updated = [field.name for field in fields if field.name not in id_names]
+    if not updated:
+        return None
+
+    components = _components(resource)
+    db = MetaResource.db
+
+    def value_source(name):
+        return '_body[{!r}]'.format(name)
+
+    src = """
+    def ctrl({arguments}):
+        if _body.__class__ is not dict:
+            return _fallback(_body, **_url)
+        {inherited_ids}
+        if _body.keys() != _FIELDS:
+            return _fallback(_body, **_url)
+        with _transaction():
+            _execute(_SQL, {parameters})
+            _dict = {dict}
+            {load}
+        return _dict
+    """.format(arguments=_arguments(['_body']),
+               inherited_ids='\n        '.join("_body[{!r}] = {}".format(name, _url_parameter(name))
+                                                for name in builder.inherited_ids),
+               parameters=_parameters('_body[{!r}]'.format(name)
+                                      for name in updated + list(id_names)),
+               dict=_dict_source(resource, value_source),
+               load='_load(_COMPONENTS, {{{}: _dict}})'.format(
+                   _key_source('_dict[{!r}]'.format(name) for name in id_names))
+               if components else '')
+
+    namespace = _converters(resource)
+    namespace.update(_fallback=builder, _execute=db.execute, _transaction=db.transaction,
+                     _SQL=db.sql_translator.update(resource._table_name, updated, id_names),
+                     _FIELDS=frozenset(field.name for field in fields),
+                     _load=_load, _COMPONENTS=components)
+    return _compile_controller(src, namespace)
+
+
+def build_delete_ctrl(builder, args_names):
+    """
+    Create optimized controller for delete resource request.
+    """
+    resource = builder.resource
+    if not _has_arguments(args_names, resource._id_fields_names):
+        return None
+
+    criteria = _where_ids(resource, resource._id_fields_names)
+    db = MetaResource.db
+
+    src = """
+    def ctrl({arguments}):
+        with _transaction():
+            count = _execute(_SQL, {parameters}).rowcount
+        if not count:
+            raise _NotFoundError()
+        return count
+    """.format(arguments=_arguments(),
+               parameters=_parameters(map(_url_parameter, resource._id_fields_names)))
+
+    namespace = {'_execute': db.execute, '_transaction': db.transaction,
+                 '_NotFoundError': NotFoundError,
+                 '_SQL': db.sql_translator.delete_where(resource._table_name, criteria.sql)}
+    return _compile_controller(src, namespace)
 
 
 def optimize(url_tree):
     """
     Replace controllers in url_tree by optimized controllers.
+
+    Only controllers built by EntryPoint.crud whose optimizable attribute
+    is True are replaced. MetaResource must be initialized.
+
+    A build_*_ctrl function returns None if the controller can't be optimized.
     """
-    for controller, args_names in url_tree.get_controllers():
+    from ..url import (GetSingleControllerBuilder, GetControllerBuilder, PostControllerBuilder,
+                       PutControllerBuilder, DeleteControllerBuilder)
 
-        if getattr(controller, 'optimizable', False):
-            analyser = Analyser(controller, args_names)
-            analyser.run()
-
-            if getattr(controller, "single", False):
-                url_tree.replace_controller(
-                    controller,
-                    build_get_single_ctrl(
-                        analyser.query,
-                        analyser.ctrl_arguments,
-                        analyser.selected_fields
-                    )
-                )
-
-            else:
-                url_tree.replace_controller(
-                    controller,
-                    build_get_ctrl(
-                        analyser.query,
-                        analyser.ctrl_arguments,
-                        analyser.selected_fields
-                    )
-                )
+    builders = {GetSingleControllerBuilder: build_get_single_ctrl,
+                GetControllerBuilder: build_get_ctrl,
+                PostControllerBuilder: build_post_ctrl,
+                PutControllerBuilder: build_put_ctrl,
+                DeleteControllerBuilder: build_delete_ctrl}
 
+    for controller, args_names in url_tree.get_controllers():
+        build = builders.get(type(controller))
+        if build is not None and getattr(controller, 'optimizable', False):
+            optimized = build(controller, args_names)
+            if optimized is not None:
+                url_tree.replace_controller(controller, optimized)
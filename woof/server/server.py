@@ -1,15 +1,21 @@
 #!/usr/bin/env python3
 #-*- coding:utf-8 -*-
 
+from collections import OrderedDict
+from collections.abc import Iterator
+from decimal import Decimal
+from itertools import islice
 from traceback import extract_tb
+from urllib.parse import parse_qsl, urlencode
+import datetime
+import importlib
 import json
 import os
 
-from .optimizer import optimize
+from .optimizer import optimize as optimize_controllers
 from ..db import IntegrityError
-
-
-OPTIMIZE = False
+from ..errors import BadRequestError, ControllerError, NotFoundError
+from ..resource import MetaResource
 
 
 class RESTServerError(Exception):
@@ -21,9 +27,89 @@ class RequestHasNotBodyError(RESTServerError):
     body = b'{"error": "Request has no body"}'
 
 
-class NotFoundError(RESTServerError):
-    code = '404 Not Found'
-    body = b'{"error": "Not Found"}'
+ERROR_STATUSES = (
+    # (error raised by controllers, HTTP status)
+    (NotFoundError, '404 Not Found'),
+    (BadRequestError, '400 Bad Request'),
+)
+
+
+def encode_default(value):
+    """
+    Return JSON serializable value of objects unknown to JSON encoders.
+
+    date and datetime values are written in ISO 8601 format as with orjson
+    and Decimal values as strings, to_py_factory of DateField, DateTimeField
+    and NumericField read them.
+    """
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError('Object of type {} is not JSON serializable'
+                    .format(type(value).__name__))
+
+
+class JSONEncoder:
+    """
+    Encode python objects to JSON bytes with the json module.
+
+    Subclasses use an other JSON module, they are registered in
+    JSON_ENCODERS with their module name. The module is imported when
+    the encoder is created, ImportError is raised if it isn't installed.
+    """
+
+    module_name = 'json'
+
+    def __init__(self):
+        self.module = importlib.import_module(self.module_name)
+        # Compact separators as orjson, chunks of streamed arrays are joined by ','.
+        self._encode = json.JSONEncoder(default=encode_default, separators=(',', ':')).encode
+
+    def dumps(self, obj):
+        return self._encode(obj).encode('utf-8')
+
+
+class OrjsonEncoder(JSONEncoder):
+    """
+    orjson writes bytes and is the fastest encoder.
+    """
+
+    module_name = 'orjson'
+
+    def __init__(self):
+        super().__init__()
+        self._dumps = self.module.dumps
+        self._option = self.module.OPT_NON_STR_KEYS
+
+    def dumps(self, obj):
+        return self._dumps(obj, default=encode_default, option=self._option)
+
+
+# The first installed encoder is used by default.
+JSON_ENCODERS = OrderedDict((
+    ('orjson', OrjsonEncoder),
+    ('json', JSONEncoder),
+))
+
+
+def get_json_encoder(name=None):
+    """
+    Return encoder registered with name in JSON_ENCODERS or the first
+    installed encoder if name is None.
+    """
+    if name is not None:
+        try:
+            return JSON_ENCODERS[name]()
+        except KeyError:
+            raise ValueError("JSON encoder must be one of {}".format(list(JSON_ENCODERS)))
+
+    for encoder in JSON_ENCODERS.values():
+        try:
+            return encoder()
+        except ImportError:
+            pass
+    raise ImportError('no JSON encoder is installed')
 
 
 def traceback_to_dict(error):
@@ -32,7 +118,7 @@ def traceback_to_dict(error):
     """
     traceback = {'error': type(error).__name__,
                  'args': error.args,
-                 'traceback': extract_tb(error.__traceback__),
+                 'traceback': [tuple(frame) for frame in extract_tb(error.__traceback__)],
                  'context': None,
                  'explicitly_chained': False}
 
@@ -46,15 +132,95 @@ def traceback_to_dict(error):
 
 
 class RESTServer:
+    """
+    WSGI application serving controllers of an EntryPoint.
+
+    router - optional class built with the entry point which resolves
+             method and path in one call such as woof.url.RegexRouter.
+             By default, the URLPathTree of the request method is used.
+    stream_batch_size - when a get controller returns an iterator instead of
+                        a list, the JSON array is sent in chunks of this
+                        number of resources.
+    transaction_per_request - if True, statements of a post, put, patch or delete
+                              controller are committed once at the end of
+                              the request and rolled back on error.
+    optimize - if True, controllers generated by EntryPoint.crud are replaced
+               by controllers specialized for their resource (see
+               woof.server.optimizer). MetaResource must be initialized.
+    json_encoder - name of the JSON_ENCODERS item encoding responses,
+                   by default the fastest installed encoder is used.
+    """
 
-    def __init__(self, entry_point):
+    def __init__(self, entry_point, router=None, stream_batch_size=100,
+                 transaction_per_request=True, optimize=False, json_encoder=None):
         self.get_urls = entry_point.get_urls
         self.put_urls = entry_point.put_urls
         self.post_urls = entry_point.post_urls
+        self.patch_urls = entry_point.patch_urls
         self.del_urls = entry_point.del_urls
         self.opt_urls = entry_point.opt_urls
-        if OPTIMIZE:
-            optimize(self.get_urls)
+        if optimize:
+            for url_tree in (self.get_urls, self.post_urls, self.put_urls, self.del_urls):
+                optimize_controllers(url_tree)
+
+        self.urls = {'GET': self.get_urls,
+                     'PUT': self.put_urls,
+                     'POST': self.post_urls,
+                     'PATCH': self.patch_urls,
+                     'DELETE': self.del_urls,
+                     'OPTIONS': self.opt_urls}
+
+        for url_tree in self.urls.values():
+            url_tree.compile()
+
+        self.router = None
+        if router is not None:
+            self.router = router(entry_point)
+
+        self.stream_batch_size = stream_batch_size
+        self.transaction_per_request = transaction_per_request
+        self.json_encoder = get_json_encoder(json_encoder)
+
+    def _resolve(self, method, path):
+        """
+        Return controller and parameters linked to method and path.
+        """
+        try:
+            if self.router is not None:
+                return self.router.get(method, path)
+            return self.urls[method].get(path)
+        except LookupError:
+            raise NotFoundError()
+
+    def _encode_json_array(self, resources):
+        """
+        Yield the JSON array of resources in chunks of encoded resources.
+        Only stream_batch_size resources are held in memory.
+        """
+        iterator = iter(resources)
+        separator = b'['
+        while True:
+            batch = list(islice(iterator, self.stream_batch_size))
+            if not batch:
+                break
+            yield separator + self.json_encoder.dumps(batch)[1:-1]
+            separator = b','
+
+        if separator == b'[':
+            yield b'[]'
+        else:
+            yield b']'
+
+    def _call_controller(self, controller, *args, **kwargs):
+        """
+        Call a controller modifying resources, in a transaction
+        if transaction_per_request is True.
+        """
+        if not self.transaction_per_request or MetaResource.db is None:
+            return controller(*args, **kwargs)
+
+        with MetaResource.db.transaction():
+            return controller(*args, **kwargs)
 
     @staticmethod
     def _parse_body(environ):
@@ -68,60 +234,85 @@ class RESTServer:
             return json.loads(request_body.decode('utf-8'))
         raise RequestHasNotBodyError()
 
+    @staticmethod
+    def _parse_query_string(environ):
+        """
+        Return query string parameters as a dict, a parameter given
+        several times raises BadRequestError.
+        """
+        parameters = parse_qsl(environ.get('QUERY_STRING', ''), keep_blank_values=True)
+        query = dict(parameters)
+        if len(query) != len(parameters):
+            names = [name for name, _ in parameters]
+            duplicate = next(name for name in names if names.count(name) > 1)
+            raise BadRequestError("'{}' is given several times".format(duplicate))
+        return query
+
     def __call__(self, environ, start_response):
         method = environ['REQUEST_METHOD']
         response_headers = [('Content-type', 'Application/json')]
+        chunks = None
 
-        environ['QUERY_STRING']
         try:
             if method == 'GET':
-                try:
-                    controller, parameters = self.get_urls.get(environ['PATH_INFO'])
-                except LookupError:
-                    raise NotFoundError()
+                controller, parameters = self._resolve(method, environ['PATH_INFO'])
+
+                if getattr(controller, 'query_string', False):
+                    query = self._parse_query_string(environ)
+                    resources = controller(query, **parameters)
+                    next_cursor = getattr(resources, 'next_cursor', None)
+                    if next_cursor is not None:
+                        query['after'] = next_cursor
+                        response_headers.append(('Link', '<{}{}?{}>; rel="next"'.format(
+                            environ.get('SCRIPT_NAME', ''), environ['PATH_INFO'],
+                            urlencode(query))))
+                else:
+                    resources = controller(**parameters)
 
-                resources = controller(**parameters)
                 if hasattr(controller, 'single') and controller.single:
                     if resources:
                         code = '200 OK'
-                        body = json.dumps(resources).encode('utf-8')
+                        body = self.json_encoder.dumps(resources)
 
                     else:
                         code = '404 Not Found'
                         body = b'{"error": "Resource not found"}'
 
+                elif isinstance(resources, Iterator):
+                    code = '200 OK'
+                    chunks = self._encode_json_array(resources)
+                    body = next(chunks)  # errors of the first batch give a 500.
+
                 else:
                     code = '200 OK'
-                    body = json.dumps(resources).encode('utf-8')
+                    body = self.json_encoder.dumps(resources)
 
             elif method == 'POST':
-                try:
-                    controller, parameters = self.post_urls.get(environ['PATH_INFO'])
-                except LookupError:
-                    raise NotFoundError()
+                controller, parameters = self._resolve(method, environ['PATH_INFO'])
 
-                resource = controller(self._parse_body(environ), **parameters)
+                resource = self._call_controller(controller, self._parse_body(environ), **parameters)
                 #response_headers.append(('Location', resource_location))
                 code = '200 Created'
-                body = json.dumps(resource).encode('utf-8')
+                body = self.json_encoder.dumps(resource)
 
             elif method == 'PUT':
-                try:
-                    controller, parameters = self.put_urls.get(environ['PATH_INFO'])
-                except LookupError:
-                    raise NotFoundError()
+                controller, parameters = self._resolve(method, environ['PATH_INFO'])
 
-                resource = controller(self._parse_body(environ), **parameters)
+                resource = self._call_controller(controller, self._parse_body(environ), **parameters)
                 code = '200 Updated'
-                body = json.dumps(resource).encode('utf-8')
+                body = self.json_encoder.dumps(resource)
+
+            elif method == 'PATCH':
+                controller, parameters = self._resolve(method, environ['PATH_INFO'])
+
+                resource = self._call_controller(controller, self._parse_body(environ), **parameters)
+                code = '200 Updated'
+                body = self.json_encoder.dumps(resource)
 
             elif method == 'DELETE':
-                try:
-                    controller, parameters = self.del_urls.get(environ['PATH_INFO'])
-                except LookupError:
-                    raise NotFoundError()
+                controller, parameters = self._resolve(method, environ['PATH_INFO'])
 
-                controller(**parameters)
+                self._call_controller(controller, **parameters)
                 code = '200 Deleted'
                 body = b'""'
 
@@ -133,14 +324,26 @@ class RESTServer:
             code = error.code
             body = error.body
 
+        except ControllerError as error:
+            code = next((status for error_type, status in ERROR_STATUSES
+                         if isinstance(error, error_type)), '500 Internal Server Error')
+            body = self.json_encoder.dumps({"error": str(error)})
+
         except IntegrityError as error:
             code = '409 Conflict'
-            body = json.dumps({"error": error.args[0]}).encode('utf-8')
+            body = self.json_encoder.dumps({"error": error.args[0]})
 
         except Exception as error:
             code = '500 Internal Server Error'
-            body = json.dumps(traceback_to_dict(error)).encode('utf-8')
+            body = self.json_encoder.dumps(traceback_to_dict(error))
 
-        start_response(code, response_headers)
-        yield body
+        try:
+            start_response(code, response_headers)
+            yield body
+            if chunks is not None:
+                yield from chunks
+        finally:
+            # The connection goes back to the pool once the response is sent.
+            if MetaResource.db is not None:
+                MetaResource.db.release()
 
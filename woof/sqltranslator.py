@@ -1,3 +1,44 @@
+import functools
+
+
+STATEMENT_CACHE_SIZE = 512
+
+_cached_statements = []
+
+
+def cached_statement(function):
+    """
+    Cache the SQL returned by function for each value of its arguments
+    in a bounded LRU cache. List arguments are converted to tuples.
+
+    The wrapper has cache_info() and cache_clear() of functools.lru_cache.
+    """
+    cached_function = functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)(function)
+
+    @functools.wraps(function)
+    def wrapper(*args):
+        return cached_function(*(tuple(arg) if isinstance(arg, list) else arg
+                                 for arg in args))
+
+    wrapper.cache_info = cached_function.cache_info
+    wrapper.cache_clear = cached_function.cache_clear
+    _cached_statements.append(wrapper)
+    return wrapper
+
+
+def statement_cache_info():
+    """
+    Return {qualified name of translator method: CacheInfo} of cached statements.
+    """
+    return {function.__qualname__: function.cache_info()
+            for function in _cached_statements}
+
+
+def clear_statement_cache():
+    for function in _cached_statements:
+        function.cache_clear()
+
+
 
 class MetaSQLTranslator(type):
 
@@ -16,6 +57,8 @@ class MetaSQLTranslator(type):
 
 class SQLTranslator(metaclass=MetaSQLTranslator):
     substitution_char = '%s'
+    max_parameters = 65535  # maximum number of parameters in a statement
+    max_in_values = 1000  # maximum number of values in one IN list
 
     @classmethod
     def create_schema(cls, table_name, fields, primary_key_field_name=[]):
@@ -125,12 +168,23 @@ class SQLTranslator(metaclass=MetaSQLTranslator):
         return sql
 
     @staticmethod
-    def save(table_name, field_names):
-        return ('INSERT INTO {} ({}) VALUES ({});'
+    @cached_statement
+    def save(table_name, field_names, nb_rows=1):
+        row = '({})'.format(','.join(['%s'] * len(field_names)))
+        return ('INSERT INTO {} ({}) VALUES {};'
                 .format(table_name, ', '.join(field_names),
-                        ','.join(['%s'] * len(field_names))))
+                        ', '.join([row] * nb_rows)))
+
+    @staticmethod
+    def first_inserted_id(last_row_id, nb_rows):
+        """
+        Return the auto increment id of the first row inserted by a
+        statement from lastrowid attribute of cursor or None if unknown.
+        """
+        return last_row_id  # LAST_INSERT_ID() gives the first row.
 
     @staticmethod
+    @cached_statement
     def update(table_name, field_names, id_names):
         set_expression = ', '.join("{} = %s".format(name)
                                   for name in field_names)
@@ -140,14 +194,119 @@ class SQLTranslator(metaclass=MetaSQLTranslator):
                 .format(table_name, set_expression, where_criteria))
 
     @staticmethod
+    @cached_statement
     def delete(table_name, id_names):
         where_criteria = " AND ".join(
             "{} = %s".format(id_name) for id_name in id_names)
         return "DELETE FROM {} WHERE {};".format(table_name, where_criteria)
 
+    @classmethod
+    @cached_statement
+    def delete_where(cls, table_name, criteria):
+        """
+        criteria - SQL criteria or None to delete all rows.
+        """
+        sql = "DELETE FROM {}".format(table_name)
+        if criteria:
+            sql += " WHERE {}".format(criteria)
+        return sql
+
+    @classmethod
+    @cached_statement
+    def update_where(cls, table_name, field_names, criteria):
+        """
+        criteria - SQL criteria or None to update all rows.
+        """
+        sql = "UPDATE {} SET {}".format(table_name, ', '.join(
+            "{} = {}".format(name, cls.substitution_char) for name in field_names))
+        if criteria:
+            sql += " WHERE {}".format(criteria)
+        return sql
+
+    @staticmethod
+    @cached_statement
+    def select(table_name, field_names):
+        return "SELECT DISTINCT {} FROM {}".format(', '.join(field_names), table_name)
+
+    @classmethod
+    def in_(cls, column, nb_values, substitution):
+        """
+        Return criteria true when column is one of nb_values values.
+        Lists longer than max_in_values are split in several IN lists.
+        """
+        if not nb_values:
+            return '1 = 0'
+        lists = []
+        for start in range(0, nb_values, cls.max_in_values):
+            size = min(cls.max_in_values, nb_values - start)
+            lists.append('{} IN ({})'.format(column, ', '.join([substitution] * size)))
+        if len(lists) == 1:
+            return lists[0]
+        return '({})'.format(' OR '.join(lists))
+
+    @staticmethod
+    def between(column, substitution):
+        return '{} BETWEEN {} AND {}'.format(column, substitution, substitution)
+
+    @staticmethod
+    def like(column, substitution):
+        """
+        Backslash escapes % and _ in the pattern.
+        """
+        return '{} LIKE {}'.format(column, substitution)
+
+    @staticmethod
+    def is_null(column, negated):
+        if negated:
+            return '{} IS NOT NULL'.format(column)
+        return '{} IS NULL'.format(column)
+
+    @staticmethod
+    @cached_statement
+    def order_by(columns):
+        """
+        columns - list of 2-tuple (column name, descending)
+        """
+        return " ORDER BY {}".format(', '.join(
+            "{} DESC".format(name) if descending else name
+            for name, descending in columns))
+
+    @classmethod
+    @cached_statement
+    def keyset(cls, columns):
+        """
+        Return criteria selecting rows after a row in the order of columns.
+        The criteria expects for each column i the values of columns 0 to i.
+
+        columns - list of 2-tuple (column name, descending)
+        """
+        criteria = []
+        for position, (name, descending) in enumerate(columns):
+            equalities = ["{} = {}".format(previous, cls.substitution_char)
+                          for previous, _ in columns[:position]]
+            equalities.append("{} {} {}".format(
+                name, '<' if descending else '>', cls.substitution_char))
+            criteria.append("({})".format(" AND ".join(equalities)))
+        return "({})".format(" OR ".join(criteria))
+
+    @staticmethod
+    def limit(limit, offset):
+        sql = ""
+        if limit is not None:
+            sql += " LIMIT {:d}".format(limit)
+        if offset:
+            sql += " OFFSET {:d}".format(offset)
+        return sql
+
 
 class MysqlTranslator(SQLTranslator):
 
+    @staticmethod
+    def limit(limit, offset):
+        if limit is None and offset:
+            limit = 18446744073709551615  # MySQL requires LIMIT with OFFSET.
+        return SQLTranslator.limit(limit, offset)
+
     @staticmethod
     def integer_field(field):
         sql = SQLTranslator.integer_field(field)
@@ -159,14 +318,35 @@ class MysqlTranslator(SQLTranslator):
 class SqliteTranslator(SQLTranslator):
 
     substitution_char = '?'
+    max_parameters = 999  # SQLITE_MAX_VARIABLE_NUMBER before sqlite 3.32
 
     @staticmethod
-    def save(table_name, field_names):
-        return ('INSERT INTO {} ({}) VALUES ({});'
+    def limit(limit, offset):
+        if limit is None and offset:
+            limit = -1  # Sqlite requires LIMIT with OFFSET.
+        return SQLTranslator.limit(limit, offset)
+
+    @staticmethod
+    def like(column, substitution):
+        # Sqlite LIKE has no escape character by default.
+        return "{} LIKE {} ESCAPE '\\'".format(column, substitution)
+
+    @staticmethod
+    @cached_statement
+    def save(table_name, field_names, nb_rows=1):
+        row = '({})'.format(','.join('?' * len(field_names)))
+        return ('INSERT INTO {} ({}) VALUES {};'
                 .format(table_name, ', '.join(field_names),
-                        ','.join('?' * len(field_names))))
+                        ', '.join([row] * nb_rows)))
 
     @staticmethod
+    def first_inserted_id(last_row_id, nb_rows):
+        if last_row_id is None:
+            return None
+        return last_row_id - nb_rows + 1  # lastrowid is the last row.
+
+    @staticmethod
+    @cached_statement
     def update(table_name, field_names, id_names):
         set_expression = ','.join("{} = ?".format(name)
                                   for name in field_names)
@@ -176,6 +356,7 @@ class SqliteTranslator(SQLTranslator):
                 .format(table_name, set_expression, where_criteria))
 
     @staticmethod
+    @cached_statement
     def delete(table_name, id_names):
         where_criteria = " AND ".join(
             "{} == ?".format(id_name) for id_name in id_names)
@@ -245,6 +426,10 @@ class SqliteTranslator(SQLTranslator):
 
 class PostgresqlTranslator(SQLTranslator):
 
+    @staticmethod
+    def first_inserted_id(last_row_id, nb_rows):
+        return None  # lastrowid is an OID instead of the id.
+
     @staticmethod
     def binary_field(field):
         return '{name} BYTEA {null}'
@@ -1,7 +1,7 @@
 #!/usr/bin/env python
 #-*- coding:utf-8 -*-
 
-import operator
+from .qsparser import build_filter
 
 def path_to_sql(register, path):
     """
@@ -69,16 +69,7 @@ def query_string_to_where_clause(entity, query_string):
     return where clause statement.
 
     arguments:
-        entity - Class peewee
-        query_string - [('<field_name>-<op>', '<value-transtyped>')]
+        entity - Resource class
+        query_string - [('<field_name>-<op>', '<value>')]
     """
-    qs_iterator = iter(query_string)
-    k, v = next(qs_iterator)
-    field, ope = k.split('-')
-    expression = getattr(operator, ope)(getattr(entity, field), v)
-    for k, v in qs_iterator:
-        field, ope = k.split('-')
-        expression = expression & (getattr(operator, ope)(getattr(entity, field), v))
-    return expression
-
-
+    return build_filter(entity, query_string)